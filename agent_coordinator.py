@@ -1,22 +1,30 @@
-from typing import Dict, List, Any, Optional
+import hashlib
+from typing import Dict, List, Any, Callable, Optional, Tuple
 from agents.analyzer_agent import AnalyzerAgent
-from agents.grammar_agent import GrammarAgent
-from agents.style_agent import StyleAgent
-from agents.seo_agent import SEOAgent
-from agents.validator_agent import ValidatorAgent
-from agents.rewriter_agent import RewriterAgent
+from agents.base_agent import STAGE_VALIDATE
+from agents.registry import AgentRegistry, build_default_registry
+from agents.sharding import ShardedExecutor
+from dedup import (apply_substitutions, batch_report, cluster_paragraphs, map_rewrite, split_paragraphs,
+                   substitution_pairs)
+from llm.prompts import load_short_system_prompt, load_system_prompt
+from llm.structured import edits_to_improvements, locate_spans
+from result_cache import ResultCache
+import tracing
 
 class AgentCoordinator:
     """Coordinates multiple agents for comprehensive text analysis"""
     
-    def __init__(self, use_knowledge_base: bool = False):
-        # Initialize agents
-        self.analyzer = AnalyzerAgent()
-        self.grammar = GrammarAgent()
-        self.style = StyleAgent()
-        self.seo = SEOAgent()
-        self.validator = ValidatorAgent()
-        self.rewriter = RewriterAgent()
+    def __init__(self, use_knowledge_base: bool = False, registry: Optional[AgentRegistry] = None,
+                 result_cache: Optional[ResultCache] = None, enable_result_cache: bool = True,
+                 sharded_executor: Optional[ShardedExecutor] = None):
+        # Initialize agents; new agents plug in through the registry
+        self.registry = registry or build_default_registry()
+        self.analyzer = AnalyzerAgent(self.registry)
+        self.grammar = self.registry.get("grammar")
+        self.style = self.registry.get("style")
+        self.seo = self.registry.get("seo")
+        self.validator = self.registry.get("validator")
+        self.rewriter = self.registry.get("rewriter")
         
         self.use_knowledge_base = use_knowledge_base
         self.knowledge_retrieval = None
@@ -45,18 +53,80 @@ class AgentCoordinator:
                 except Exception as e2:
                     print(f"Could not load mock knowledge base: {e2}")
                     self.use_knowledge_base = False
+        
+        # Complete results are cached per text, agent selection and pipeline version
+        self.result_cache = (result_cache or ResultCache()) if enable_result_cache else None
+        
+        # Heuristic agents run across processes for very long documents when set
+        self.sharded_executor = sharded_executor
     
-    def process_text(self, text: str, selected_agents: List[str] = None) -> Dict[str, Any]:
-        """Process text through selected agents"""
+    def pipeline_fingerprint(self) -> str:
+        """Hash of agent/rule versions, prompts and knowledge base version"""
+        parts = [self.analyzer.cache_fingerprint()]
+        parts += [self.registry.get(key).cache_fingerprint() for key in self.registry.keys()]
+        parts.append(load_system_prompt() or "")
+        parts.append(load_short_system_prompt() or "")
+        if self.use_knowledge_base and self.knowledge_retrieval is not None:
+            parts.append(str(getattr(
+                self.knowledge_retrieval, "version", type(self.knowledge_retrieval).__name__
+            )))
+        return hashlib.sha256("\n".join(parts).encode("utf-8")).hexdigest()
+    
+    def process_text(self, text: str, selected_agents: List[str] = None,
+                     latency_budget_ms: float = None,
+                     progress_callback: Optional[Callable[[str], None]] = None) -> Dict[str, Any]:
+        """Process text through selected agents, reporting each completed stage"""
+        if self.result_cache is None:
+            return self._run_pipeline(text, selected_agents, latency_budget_ms, progress_callback)
         
-        # Step 1: Analyze text
-        analysis = self.analyzer.analyze(text)
+        fingerprint = self.pipeline_fingerprint()
+        key = self.result_cache.key(
+            fingerprint, text,
+            selected_agents=selected_agents,
+            latency_budget_ms=latency_budget_ms
+        )
+        results = self.result_cache.get(fingerprint, key)
+        if results is not None:
+            if progress_callback:
+                progress_callback("cache")
+            return results
         
-        # Step 2: Determine which agents to use
+        results = self._run_pipeline(text, selected_agents, latency_budget_ms, progress_callback)
+        # Do not cache failed runs (e.g. missing API key or LLM errors)
+        if not any("error" in agent_result for agent_result in results["agent_results"].values()):
+            self.result_cache.put(fingerprint, key, results)
+        return results
+    
+    def _plan(self, text: str, selected_agents: Optional[List[str]],
+              latency_budget_ms: Optional[float]) -> Tuple[Dict[str, Any], List[str]]:
+        """Analyze the text and decide which agents to run"""
+        with tracing.span("analyzer"):
+            analysis = self.analyzer.analyze(text, context={"latency_budget_ms": latency_budget_ms})
         if selected_agents is None:
-            agents_to_use = analysis.get("recommended_agents", ["grammar", "style", "validator"])
+            agents_to_use = analysis.get("recommended_agents")
+            if agents_to_use is None:
+                agents_to_use = self.registry.resolve(["rewriter", "grammar", "style", "validator"], analysis)
         else:
-            agents_to_use = selected_agents
+            agents_to_use = self.registry.resolve(selected_agents, analysis)
+        return analysis, agents_to_use
+    
+    def _agent_context(self, analysis: Dict[str, Any]) -> Dict[str, Any]:
+        return {
+            "knowledge_retrieval": self.knowledge_retrieval if self.use_knowledge_base else None,
+            "text_analysis": analysis
+        }
+    
+    def _run_pipeline(self, text: str, selected_agents: Optional[List[str]],
+                      latency_budget_ms: Optional[float],
+                      progress_callback: Optional[Callable[[str], None]],
+                      plan: Optional[Tuple[Dict[str, Any], List[str]]] = None,
+                      precomputed: Optional[Dict[str, Dict[str, Any]]] = None) -> Dict[str, Any]:
+        """Run the analyzer and the planned agents over the text"""
+        
+        # Steps 1-2: Analyze text and determine which agents to use
+        analysis, agents_to_use = plan or self._plan(text, selected_agents, latency_budget_ms)
+        if progress_callback:
+            progress_callback("analyzer")
         
         results = {
             "original_text": text,
@@ -68,78 +138,37 @@ class AgentCoordinator:
             "knowledge_guidelines": []
         }
         
-        # Step 3: Get comprehensive rewrite first
-        agent_context = {
-            "knowledge_retrieval": self.knowledge_retrieval if self.use_knowledge_base else None,
-            "text_analysis": analysis
-        }
-
-        # Use rewriter for main text revision
-        rewriter_result = self.rewriter.analyze(text, context=agent_context)
-        current_text = rewriter_result.get("rewritten_text", text)
-
-        # Add rewriter improvements
-        for improvement in rewriter_result.get("improvements", []):
-            results["improvements"].append({
-                "agent": "rewriter",
-                "type": improvement["type"],
-                "description": improvement["description"],
-                "reason": improvement["reason"]
-            })
-
-        # Add rewriter to agent results
-        results["agent_results"]["rewriter"] = rewriter_result
-
-        # Step 4: Process with other agents for additional refinements
+        agent_context = self._agent_context(analysis)
+        current_text = text
         
-        if "grammar" in agents_to_use:
-            grammar_result = self.grammar.analyze(current_text, context=agent_context)
-            results["agent_results"]["grammar"] = grammar_result
-            
-            # Apply basic corrections for demonstration
-            for correction in grammar_result.get("corrections", []):
-                if correction["original"] in current_text:
-                    current_text = current_text.replace(
-                        correction["original"], 
-                        correction["corrected"]
-                    )
-                    results["improvements"].append({
-                        "agent": "grammar",
-                        "type": correction["type"],
-                        "change": f"{correction['original']} → {correction['corrected']}",
-                        "reason": correction["reason"],
-                        "reference": correction.get("pdf_reference", "")
-                    })
-        
-        if "style" in agents_to_use:
-            style_result = self.style.analyze(current_text, context=agent_context)
-            results["agent_results"]["style"] = style_result
-            
-            # Add style recommendations (not automatic corrections)
-            for improvement in style_result.get("improvements", []):
-                results["improvements"].append({
-                    "agent": "style", 
-                    "type": improvement["type"],
-                    "suggestion": improvement["corrected"],
-                    "reason": improvement["reason"],
-                    "reference": improvement.get("pdf_reference", "")
-                })
-        
-        if "seo" in agents_to_use and analysis.get("text_type") == "web":
-            seo_result = self.seo.analyze(current_text)
-            results["agent_results"]["seo"] = seo_result
-            
-            # Add SEO recommendations
-            for rec in seo_result.get("seo_recommendations", []):
-                results["improvements"].append({
-                    "agent": "seo",
-                    "type": rec["type"],
-                    "recommendation": rec["recommendation"],
-                    "reason": rec["reason"],
-                    "reference": rec.get("pdf_reference", "")
-                })
-        
-        # Step 5: Collect all knowledge base guidelines from agents
+        # Explicit selections run as given; planned agents are skipped when they do not apply
+        agents_to_use = [
+            name for name in agents_to_use
+            if selected_agents is not None or self.registry.get(name).applies_to(analysis)
+        ]
+        refine_agents = [name for name in agents_to_use if self.registry.get(name).stage != STAGE_VALIDATE]
+        validate_agents = [name for name in agents_to_use if self.registry.get(name).stage == STAGE_VALIDATE]
+        run_order = refine_agents + validate_agents
+        # Shard partials computed ahead for agents that will see the same text
+        prefetched: Dict[str, Tuple[str, Tuple[List[Dict[str, Any]], List[int]]]] = {}
+        
+        # Step 3: Rewrite and refine, feeding each agent the current text
+        for agent_name in refine_agents:
+            agent = self.registry.get(agent_name)
+            if precomputed and agent_name in precomputed:
+                agent_result = precomputed[agent_name]
+            else:
+                agent_result = self._analyze(
+                    agent_name, agent, current_text, agent_context,
+                    run_order[run_order.index(agent_name) + 1:], prefetched
+                )
+            results["agent_results"][agent_name] = agent_result
+            current_text, improvements = agent.merge_result(current_text, agent_result)
+            results["improvements"].extend(improvements)
+            if progress_callback:
+                progress_callback(agent_name)
+        
+        # Step 4: Collect all knowledge base guidelines from agents
         all_kb_guidelines = []
         for agent_name, agent_result in results["agent_results"].items():
             kb_guidelines = agent_result.get("kb_guidelines", [])
@@ -158,73 +187,276 @@ class AgentCoordinator:
         
         results["knowledge_guidelines"] = unique_guidelines[:5]  # Limit to 5 guidelines
         
-        # Step 6: Final validation
-        if "validator" in agents_to_use:
-            validation = self.validator.analyze(current_text, context=results)
-            results["final_validation"] = validation
+        # Step 5: Final validation
+        for agent_name in validate_agents:
+            agent = self.registry.get(agent_name)
+            results["final_validation"] = self._analyze(
+                agent_name, agent, current_text, results,
+                run_order[run_order.index(agent_name) + 1:], prefetched
+            )
+            if progress_callback:
+                progress_callback(agent_name)
         
         results["corrected_text"] = current_text
         
         return results
     
-    def get_available_agents(self) -> Dict[str, str]:
-        """Get list of available agents and their descriptions"""
+    def _analyze(self, agent_name: str, agent, text: str, context: Dict[str, Any],
+                 upcoming: List[str] = (), prefetched: Optional[Dict[str, Any]] = None) -> Dict[str, Any]:
+        """Run one agent, sharding the text across processes when it is long enough"""
+        with tracing.span(agent_name) as span:
+            sharded = None
+            if prefetched is not None and agent_name in prefetched:
+                prefetched_text, sharded = prefetched.pop(agent_name)
+                if prefetched_text != text:
+                    sharded = None
+            if sharded is None and self.sharded_executor is not None and self.sharded_executor.should_shard(agent, text):
+                # One shared-memory pass for this agent and the upcoming ones that see the same text
+                batch = self._shard_batch(agent_name, agent, upcoming)
+                partials = self.sharded_executor.analyze_shards(batch, text)
+                sharded = partials[agent_name]
+                if prefetched is not None:
+                    for key in batch:
+                        if key != agent_name:
+                            prefetched[key] = (text, partials[key])
+            if sharded is not None:
+                result = agent.merge_shards(text, sharded[0], sharded[1], context)
+            else:
+                result = agent.analyze(text, context=context)
+            # Agents report failures in their result; surface them for tail sampling
+            if span is not None and "error" in result:
+                span["error"] = result["error"]
+        return result
+    
+    def _shard_batch(self, agent_name: str, agent, upcoming: List[str]) -> Dict[str, Any]:
+        """The agent plus the upcoming shardable agents that will analyze the same text"""
+        batch = {agent_name: agent}
+        previous = agent
+        for key in upcoming:
+            if previous.edits_text:
+                break
+            previous = self.registry.get(key)
+            if previous.shardable:
+                batch[key] = previous
+        return batch
+    
+    def process_batch(self, texts: List[str], selected_agents: List[str] = None) -> Dict[str, Any]:
+        """Process many documents, rewriting near-duplicate paragraphs shared across documents once"""
+        plans = [self._plan(text, selected_agents, None) for text in texts]
+        doc_parts = [split_paragraphs(text) for text in texts]
+        
+        # Documents whose plan includes the LLM rewrite, and their paragraphs
+        rewrite_docs = [
+            doc for doc, (analysis, agents_to_use) in enumerate(plans)
+            if "rewriter" in agents_to_use and (selected_agents is not None or self.rewriter.applies_to(analysis))
+        ]
+        paragraphs = []  # (document index, part index, paragraph text)
+        for doc in rewrite_docs:
+            for part, paragraph in enumerate(doc_parts[doc]):
+                if part % 2 == 0 and paragraph.strip():
+                    paragraphs.append((doc, part, paragraph))
+        
+        clusters = self._shared_clusters(paragraphs)
+        covered_docs = {paragraphs[index][0] for cluster in clusters for index in cluster}
+        if len(clusters) >= len(covered_docs):
+            # Paragraph calls would cost at least one rewrite per covered document
+            clusters = []
+        rewrites: Dict[int, Dict[str, Any]] = {}
+        failed_docs = set()
+        llm_calls = fallbacks = 0
+        for cluster in clusters:
+            representative = cluster[0]
+            doc, _, rep_text = paragraphs[representative]
+            rep_result = self.rewriter.analyze(rep_text, context=self._agent_context(plans[doc][0]))
+            rewrites[representative] = rep_result
+            llm_calls += 1
+            
+            for member in cluster[1:]:
+                doc, _, member_text = paragraphs[member]
+                derived = None
+                if "error" not in rep_result:
+                    derived = self._derive_rewrite(rep_text, member_text, rep_result)
+                if derived is None:
+                    # The rewrite did not keep the differing spans: rewrite the whole document
+                    fallbacks += 1
+                    failed_docs.add(doc)
+                else:
+                    rewrites[member] = derived
+        
+        paragraph_results: Dict[int, Dict[int, Dict[str, Any]]] = {}
+        for index, (doc, part, _) in enumerate(paragraphs):
+            if index in rewrites and doc not in failed_docs:
+                paragraph_results.setdefault(doc, {})[part] = rewrites[index]
+        
+        results = []
+        for doc, text in enumerate(texts):
+            precomputed = None
+            if doc in paragraph_results:
+                precomputed = {"rewriter": self._combine_rewrites(doc_parts[doc], paragraph_results[doc])}
+            elif doc in rewrite_docs:
+                # The pipeline rewrites the whole document in one call
+                llm_calls += 1
+            results.append(self._run_pipeline(
+                text, selected_agents, None, None, plan=plans[doc], precomputed=precomputed
+            ))
+        
         return {
-            "analyzer": "Analyzes text and classifies issues",
-            "rewriter": "Provides comprehensive text rewriting for clarity",
-            "grammar": "Checks and corrects grammar errors",
-            "style": "Suggests style improvements for clarity",
-            "seo": "Optimizes for search engines while maintaining clarity",
-            "validator": "Performs final quality validation"
+            "results": results,
+            "report": batch_report(len(rewrite_docs), len(paragraphs), llm_calls, len(clusters), fallbacks)
         }
     
-    def format_results_for_display(self, results: Dict[str, Any]) -> str:
-        """Format results for Streamlit display"""
-        output = []
+    def _shared_clusters(self, paragraphs: List[Tuple[int, int, str]]) -> List[List[int]]:
+        """Clusters shared across documents made only of shared paragraphs"""
+        # A document with any paragraph of its own still costs one rewrite call, so
+        # splitting it into paragraph calls never saves anything; process_batch then
+        # checks that the clusters cost fewer calls than the documents they cover
+        candidates = cluster_paragraphs([paragraph for _, _, paragraph in paragraphs])
+        while True:
+            clusters = []
+            for cluster in candidates:
+                # Only members differing by pure substitutions can reuse the representative's rewrite
+                rep_text = paragraphs[cluster[0]][2]
+                cluster = cluster[:1] + [
+                    member for member in cluster[1:]
+                    if substitution_pairs(rep_text, paragraphs[member][2]) is not None
+                ]
+                if len({paragraphs[index][0] for index in cluster}) > 1:
+                    clusters.append(cluster)
+            covered = {index for cluster in clusters for index in cluster}
+            excluded = {doc for index, (doc, _, _) in enumerate(paragraphs) if index not in covered}
+            pruned = [
+                [index for index in cluster if paragraphs[index][0] not in excluded]
+                for cluster in clusters
+            ]
+            if pruned == candidates:
+                return clusters
+            candidates = [cluster for cluster in pruned if cluster]
+    
+    def _derive_rewrite(self, rep_text: str, variant_text: str,
+                        rep_result: Dict[str, Any]) -> Optional[Dict[str, Any]]:
+        """Reuse a representative's rewrite for a near-duplicate paragraph"""
+        mapped = map_rewrite(rep_text, variant_text, rep_result["rewritten_text"])
+        if mapped is None:
+            return None
+        rewritten_text, pairs = mapped
         
-        # Corrected text
-        output.append("## TEXTO CORREGIDO")
-        output.append(results["corrected_text"])
-        output.append("")
+        edits = []
+        for edit in rep_result.get("edits", []):
+            original = apply_substitutions(edit["original"], pairs, strict=False)
+            corrected = apply_substitutions(edit["corrected"], pairs, strict=False)
+            if original is None or corrected is None:
+                continue  # the edit cannot be mapped safely; the rewritten text still applies
+            edits.append(dict(edit, original=original, corrected=corrected))
+        edits = locate_spans(edits, variant_text)
         
-        # Analysis summary
+        derived = dict(rep_result)
+        derived.pop("full_response", None)
+        derived.update({
+            "rewritten_text": rewritten_text,
+            "edits": edits,
+            "improvements": edits_to_improvements(edits),
+            "deduplicated": True
+        })
+        return derived
+    
+    def _combine_rewrites(self, parts: List[str], paragraph_results: Dict[int, Dict[str, Any]]) -> Dict[str, Any]:
+        """Assemble per-paragraph rewrites into one rewriter result for the document"""
+        combined = {
+            "rewritten_text": "",
+            "improvements": [],
+            "edits": [],
+            "principles": [],
+            "confidence": 0.9,
+            "agent": self.rewriter.name
+        }
+        rewritten_parts = []
+        offset = 0
+        for part, paragraph in enumerate(parts):
+            result = paragraph_results.get(part)
+            if result is None:
+                rewritten_parts.append(paragraph)
+            else:
+                rewritten_parts.append(result["rewritten_text"])
+                if "error" in result:
+                    combined.setdefault("error", result["error"])
+                for key in ("improvements", "edits"):
+                    for item in result.get(key, []):
+                        item = dict(item)
+                        if item.get("start") is not None:
+                            item["start"] += offset
+                            item["end"] += offset
+                        combined[key].append(item)
+                for principle in result.get("principles", []):
+                    if principle not in combined["principles"]:
+                        combined["principles"].append(principle)
+            offset += len(paragraph)
+        combined["rewritten_text"] = "".join(rewritten_parts)
+        return combined
+    
+    def get_available_agents(self) -> Dict[str, str]:
+        """Get list of available agents and their descriptions"""
+        agents = {"analyzer": self.analyzer.description}
+        for agent_name in self.registry.keys():
+            agents[agent_name] = self.registry.get(agent_name).description
+        return agents
+    
+    def format_results_for_display(self, results: Dict[str, Any]) -> str:
+        """Format results for Streamlit display"""
+        return "\n".join(section for section in self.format_sections(results).values() if section)
+    
+    def format_sections(self, results: Dict[str, Any]) -> Dict[str, str]:
+        """Markdown for each display section, so the app can render them independently"""
+        return {
+            "corrected_text": self.format_corrected_text(results),
+            "analysis": self.format_analysis(results),
+            "improvements": self.format_improvements(results.get("improvements", [])),
+            "guidelines": self.format_guidelines(results.get("knowledge_guidelines", [])),
+            "quality": self.format_quality(results)
+        }
+    
+    def format_corrected_text(self, results: Dict[str, Any]) -> str:
+        return "\n".join(["## TEXTO CORREGIDO", results["corrected_text"], ""])
+    
+    def format_analysis(self, results: Dict[str, Any]) -> str:
         analysis = results.get("analysis", {})
-        output.append("## ANÁLISIS")
+        output = ["## ANÁLISIS"]
         output.append(f"**Tipo de texto**: {analysis.get('text_type', 'No determinado')}")
         output.append(f"**Nivel de severidad**: {analysis.get('severity_level', 'No determinado')}")
         if analysis.get("issues_detected"):
             output.append(f"**Problemas detectados**: {', '.join(analysis['issues_detected'])}")
         output.append("")
-        
-        # Improvements
-        if results.get("improvements"):
-            output.append("## MEJORAS APLICADAS")
-            for i, improvement in enumerate(results["improvements"], 1):
-                output.append(f"**{i}. {improvement['agent'].upper()}**")
-                if "change" in improvement:
-                    output.append(f"   - Cambio: {improvement['change']}")
-                if "suggestion" in improvement:
-                    output.append(f"   - Sugerencia: {improvement['suggestion']}")
-                if "recommendation" in improvement:
-                    output.append(f"   - Recomendación: {improvement['recommendation']}")
-                output.append(f"   - Razón: {improvement['reason']}")
-                if improvement.get("reference"):
-                    output.append(f"   - Referencia: {improvement['reference']}")
-                output.append("")
-        
-        # Knowledge base guidelines
-        if results.get("knowledge_guidelines"):
-            output.append("## DIRECTRICES DEL MANUAL")
-            for i, guideline in enumerate(results["knowledge_guidelines"], 1):
-                output.append(f"**{i}. Página {guideline['page']}** (Relevancia: {guideline['relevance']:.1%})")
-                output.append(f"   {guideline['content'][:200]}...")
-                output.append("")
-        
-        # Quality metrics
-        if results.get("final_validation"):
-            validation = results["final_validation"]
-            if "quality_score" in validation:
-                quality_score = validation["quality_score"]
-                output.append(f"## PUNTUACIÓN DE CALIDAD: {quality_score:.1%}")
-        
-        return "\n".join(output)
\ No newline at end of file
+        return "\n".join(output)
+    
+    def format_improvements(self, improvements: List[Dict[str, Any]]) -> str:
+        if not improvements:
+            return ""
+        output = ["## MEJORAS APLICADAS"]
+        for i, improvement in enumerate(improvements, 1):
+            output.append(f"**{i}. {improvement['agent'].upper()}**")
+            if "change" in improvement:
+                output.append(f"   - Cambio: {improvement['change']}")
+            if "suggestion" in improvement:
+                output.append(f"   - Sugerencia: {improvement['suggestion']}")
+            if "recommendation" in improvement:
+                output.append(f"   - Recomendación: {improvement['recommendation']}")
+            output.append(f"   - Razón: {improvement['reason']}")
+            if improvement.get("reference"):
+                output.append(f"   - Referencia: {improvement['reference']}")
+            output.append("")
+        return "\n".join(output)
+    
+    def format_guidelines(self, guidelines: List[Dict[str, Any]]) -> str:
+        if not guidelines:
+            return ""
+        output = ["## DIRECTRICES DEL MANUAL"]
+        for i, guideline in enumerate(guidelines, 1):
+            output.append(f"**{i}. Página {guideline['page']}** (Relevancia: {guideline['relevance']:.1%})")
+            output.append(f"   {guideline['content'][:200]}...")
+            output.append("")
+        return "\n".join(output)
+    
+    def format_quality(self, results: Dict[str, Any]) -> str:
+        validation = results.get("final_validation") or {}
+        if "quality_score" not in validation:
+            return ""
+        return f"## PUNTUACIÓN DE CALIDAD: {validation['quality_score']:.1%}"
@@ -1,22 +1,31 @@
 from typing import Dict, List, Any
 from .base_agent import BaseAgent
+from .lexicon import get_lexicon, source_fingerprint
+from .passive_voice import has_passive_voice
+from .tokenizer import tokenize
 
 class AnalyzerAgent(BaseAgent):
     """Agent for initial text analysis and classification"""
+
+    description = "Analyzes text and classifies issues"
     
-    def __init__(self):
+    def __init__(self, registry=None):
         super().__init__("Analyzer")
+        self.registry = registry
     
     def analyze(self, text: str, context: Dict[str, Any] = None) -> Dict[str, Any]:
         """Analyze text and classify for routing to other agents"""
-        # Placeholder implementation
+        latency_budget_ms = context.get("latency_budget_ms") if context else None
         return {
             "text_type": self._classify_text_type(text),
             "issues_detected": self._detect_issues(text),
-            "recommended_agents": self._recommend_agents(text),
+            "recommended_agents": self._recommend_agents(text, latency_budget_ms),
             "severity_level": self._assess_severity(text)
         }
     
+    def cache_fingerprint(self) -> str:
+        return f"{super().cache_fingerprint()}:lexicon={source_fingerprint()}"
+    
     def get_capabilities(self) -> List[str]:
         return [
             "text_classification",
@@ -45,25 +54,33 @@ class AnalyzerAgent(BaseAgent):
             if len(sentence.split()) > 30:
                 issues.append("long_sentence")
         
-        # Check for complex words (placeholder)
-        if any(len(word) > 12 for word in text.split()):
+        # Check for jargon and long uncommon words at token level
+        lexicon = get_lexicon()
+        tokens = tokenize(text)
+        if any(lexicon.is_complex(token.lower) for token in tokens) or lexicon.find_substitutions(tokens):
             issues.append("complex_vocabulary")
+        
+        if has_passive_voice(text):
+            issues.append("passive_voice")
             
         return list(set(issues))
     
-    def _recommend_agents(self, text: str) -> List[str]:
+    def _recommend_agents(self, text: str, latency_budget_ms: float = None) -> List[str]:
         """Recommend which agents should process this text"""
-        agents = ["grammar"]  # Always check grammar
+        if self.registry is None:
+            from .registry import build_default_registry
+            self.registry = build_default_registry()
         
+        text_type = self._classify_text_type(text)
         issues = self._detect_issues(text)
-        if "long_sentence" in issues or "complex_vocabulary" in issues:
-            agents.append("style")
+        if text_type == "web":
+            issues.append("web_content")
         
-        if self._classify_text_type(text) == "web":
-            agents.append("seo")
-            
-        agents.append("validator")  # Always validate
-        return agents
+        return self.registry.plan(
+            issues,
+            analysis={"text_type": text_type, "issues_detected": issues},
+            latency_budget_ms=latency_budget_ms
+        )
     
     def _assess_severity(self, text: str) -> str:
         """Assess severity level of issues"""
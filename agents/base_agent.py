@@ -1,18 +1,71 @@
 from abc import ABC, abstractmethod
-from typing import Dict, List, Any
+from typing import Dict, List, Any, Tuple
+
+# Execution stages used to order agents within a pipeline run
+STAGE_REWRITE = 0
+STAGE_REFINE = 1
+STAGE_VALIDATE = 2
+
+def offset_spans(items: List[Dict[str, Any]], offset: int) -> List[Dict[str, Any]]:
+    """Shift the [start, end) offsets of shard-relative items into document offsets"""
+    if not offset:
+        return items
+    shifted = []
+    for item in items:
+        if item.get("start") is not None:
+            item = {**item, "start": item["start"] + offset, "end": item["end"] + offset}
+        shifted.append(item)
+    return shifted
 
 class BaseAgent(ABC):
     """Base class for all text analysis agents"""
-    
+
+    # Bump when the agent's output changes, to invalidate cached results
+    version: str = "1"
+
+    # Routing metadata read by the agent registry
+    description: str = ""
+    uses_llm: bool = False
+    expected_latency_ms: float = 5.0
+    dependencies: List[str] = []
+    handles_issues: List[str] = []
+    always_run: bool = False
+    stage: int = STAGE_REFINE
+    # Whether analyze_shard/merge_shards can split a long document across processes
+    shardable: bool = False
+    # Whether merge_result changes the text seen by the agents after this one
+    edits_text: bool = False
+
     def __init__(self, name: str):
         self.name = name
-        
+
     @abstractmethod
     def analyze(self, text: str, context: Dict[str, Any] = None) -> Dict[str, Any]:
         """Analyze text and return improvements"""
         pass
-    
+
     @abstractmethod
     def get_capabilities(self) -> List[str]:
         """Return list of agent capabilities"""
-        pass
\ No newline at end of file
+        pass
+
+    def cache_fingerprint(self) -> str:
+        """Identify everything that determines this agent's output, for result caching"""
+        return f"{type(self).__name__}:{self.version}"
+
+    def applies_to(self, analysis: Dict[str, Any]) -> bool:
+        """Whether the agent is relevant for a text with this analysis"""
+        return True
+
+    def merge_result(self, text: str, result: Dict[str, Any]) -> Tuple[str, List[Dict[str, Any]]]:
+        """Apply the agent result to the text and return the improvements to report"""
+        return text, []
+
+    def analyze_shard(self, text: str) -> Dict[str, Any]:
+        """Partial result for one sentence-aligned shard, with shard-relative offsets"""
+        raise NotImplementedError(f"{type(self).__name__} is not shardable")
+
+    def merge_shards(self, text: str, partials: List[Dict[str, Any]], offsets: List[int],
+                     context: Dict[str, Any] = None) -> Dict[str, Any]:
+        """Combine shard partials (in document order) into the result analyze() would return"""
+        raise NotImplementedError(f"{type(self).__name__} is not shardable")
\ No newline at end of file
@@ -0,0 +1,57 @@
+import re
+from typing import Dict, List, Any, Pattern, Sequence, Tuple
+
+def match_case(original: str, replacement: str) -> str:
+    """Capitalize the replacement when the original starts with a capital letter"""
+    if original[:1].isupper():
+        return replacement[:1].upper() + replacement[1:]
+    return replacement
+
+def compile_rules(rules: Sequence[Tuple[str, str, str, str]]) -> Pattern:
+    """One alternation over all rule patterns, so the text is scanned once"""
+    # Each pattern matches exactly the span to replace and checks its context with lookarounds
+    return re.compile(
+        "|".join(f"(?P<r{i}>{pattern})" for i, (pattern, _, _, _) in enumerate(rules)),
+        re.IGNORECASE
+    )
+
+def find_corrections(text: str, pattern: Pattern, rules: Sequence[Tuple[str, str, str, str]],
+                     correction_type: str = "grammar") -> List[Dict[str, Any]]:
+    """Every matched occurrence with its exact [start, end) span, in text order"""
+    corrections = []
+    for match in pattern.finditer(text):
+        _, corrected, reason, reference = rules[int(match.lastgroup[1:])]
+        original = match.group()
+        corrections.append({
+            "type": correction_type,
+            "original": original,
+            "corrected": match_case(original, corrected),
+            "reason": reason,
+            "pdf_reference": reference,
+            "start": match.start(),
+            "end": match.end()
+        })
+    return corrections
+
+def apply_corrections(text: str, corrections: List[Dict[str, Any]]) -> Tuple[str, List[Dict[str, Any]]]:
+    """Apply span corrections in one left-to-right pass and return the applied ones"""
+    # Overlaps go to the edit starting first (the longer one on ties). Corrections
+    # usually arrive sorted, which makes this sort linear
+    ordered = sorted(
+        (c for c in corrections if c.get("start") is not None),
+        key=lambda c: (c["start"], -c["end"])
+    )
+    output = []
+    applied = []
+    cursor = 0
+    for correction in ordered:
+        start, end = correction["start"], correction["end"]
+        # Skip overlapping edits and stale spans; unmatched occurrences are never touched
+        if start < cursor or text[start:end] != correction["original"]:
+            continue
+        output.append(text[cursor:start])
+        output.append(correction["corrected"])
+        applied.append(correction)
+        cursor = end
+    output.append(text[cursor:])
+    return "".join(output), applied
\ No newline at end of file
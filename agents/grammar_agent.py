@@ -1,16 +1,56 @@
-import re
-from typing import Dict, List, Any
-from .base_agent import BaseAgent
+from typing import Dict, List, Any, Tuple
+from .base_agent import BaseAgent, offset_spans
+from .corrections import apply_corrections, compile_rules, find_corrections
+
+# (pattern matching the exact span to fix, corrected form, reason, reference)
+GRAMMAR_RULES = [
+    # Basic checks for demonstration
+    (r"\bque\s+que\b", "que", "Repetición innecesaria de 'que'", "Sección de conectores"),
+    # Only suggest "él" when "el" is likely a pronoun (before verbs)
+    (r"\bel\b(?=\s+(?:es|está|tiene|hace|dice|va|fue|será|puede|debe)\b)", "él",
+     "Posible pronombre personal que requiere acento", "Sección de acentuación"),
+    # For other accent cases, be more conservative with context
+    (r"\bmas\b(?=\s+(?:que|de|bien|mal|o|menos)\b)", "más",  # "más que", "más de", etc.
+     "Posible falta de acento en 'mas' (contexto: pronombre/adverbio)", "Sección de acentuación"),
+    # Affirmative "sí" follows its subject ("él sí quiere"); at the start of a sentence
+    # or clause, or after a conjunction, "si" opens a conditional ("Si quiere más...")
+    (r"(?<=\w )(?<!\by )(?<!\bo )(?<!\bque )(?<!\bpero )(?<!\bporque )(?<!\baunque )(?<!\bcomo )"
+     r"\bsi\b(?=\s+(?:quiere|puede|es|está)\b)", "sí",  # "sí quiere", "sí puede", etc.
+     "Posible falta de acento en 'si' (contexto: pronombre/adverbio)", "Sección de acentuación"),
+    (r"\btu\b(?=\s+(?:eres|estás|tienes|haces|dices|vas)\b)", "tú",  # "tú eres", "tú estás", etc.
+     "Posible falta de acento en 'tu' (contexto: pronombre/adverbio)", "Sección de acentuación")
+]
+
+_GRAMMAR_PATTERN = compile_rules(GRAMMAR_RULES)
 
 class GrammarAgent(BaseAgent):
     """Agent for grammar and syntax corrections"""
-    
+
+    # 2: span-based corrections replace whole-text str.replace
+    # 3: conditional "si" is no longer accented
+    version = "3"
+    description = "Checks and corrects grammar errors"
+    expected_latency_ms = 5.0
+    always_run = True
+    handles_issues = ["grammar_error"]
+    shardable = True
+    edits_text = True
+
     def __init__(self):
         super().__init__("Grammar")
     
     def analyze(self, text: str, context: Dict[str, Any] = None) -> Dict[str, Any]:
         """Analyze grammar and suggest corrections"""
-        corrections = self._find_grammar_issues(text)
+        return self.merge_shards(text, [self.analyze_shard(text)], [0], context)
+    
+    def analyze_shard(self, text: str) -> Dict[str, Any]:
+        return {"corrections": self._find_grammar_issues(text)}
+    
+    def merge_shards(self, text: str, partials: List[Dict[str, Any]], offsets: List[int],
+                     context: Dict[str, Any] = None) -> Dict[str, Any]:
+        corrections = []
+        for partial, offset in zip(partials, offsets):
+            corrections.extend(offset_spans(partial["corrections"], offset))
         
         # Add knowledge base guidelines if available
         kb_guidelines = []
@@ -40,47 +80,21 @@ class GrammarAgent(BaseAgent):
             "agreement_checking"
         ]
     
-    def _find_grammar_issues(self, text: str) -> List[Dict[str, str]]:
-        """Find grammar issues (placeholder implementation)"""
-        corrections = []
-        
-        # Basic checks for demonstration
-        if "que que" in text.lower():
-            corrections.append({
-                "type": "grammar",
-                "original": "que que",
-                "corrected": "que",
-                "reason": "Repetición innecesaria de 'que'",
-                "pdf_reference": "Sección de conectores"
-            })
-        
-        # Check for missing accents with context checking
-        
-        # Only suggest "él" when "el" is likely a pronoun (before verbs)
-        if re.search(r'\bel\s+(es|está|tiene|hace|dice|va|fue|será|puede|debe)\b', text.lower()):
-            corrections.append({
-                "type": "grammar",
-                "original": "el",
-                "corrected": "él",
-                "reason": "Posible pronombre personal que requiere acento",
-                "pdf_reference": "Sección de acentuación"
-            })
-        
-        # For other accent cases, be more conservative with context
-        accent_context_pairs = [
-            ("mas", "más", r'\bmas\s+(que|de|bien|mal|o|menos)\b'),  # "más que", "más de", etc.
-            ("si", "sí", r'\bsi\s+(quiere|puede|es|está)\b'),  # "sí quiere", "sí puede", etc.
-            ("tu", "tú", r'\btu\s+(eres|estás|tienes|haces|dices|vas)\b')  # "tú eres", "tú estás", etc.
+    def merge_result(self, text: str, result: Dict[str, Any]) -> Tuple[str, List[Dict[str, Any]]]:
+        """Apply the grammar corrections at their spans and report each applied change"""
+        text, applied = apply_corrections(text, result.get("corrections", []))
+        improvements = [
+            {
+                "agent": "grammar",
+                "type": correction["type"],
+                "change": f"{correction['original']} → {correction['corrected']}",
+                "reason": correction["reason"],
+                "reference": correction.get("pdf_reference", "")
+            }
+            for correction in applied
         ]
-        
-        for original, corrected, context_pattern in accent_context_pairs:
-            if re.search(context_pattern, text.lower()):
-                corrections.append({
-                    "type": "grammar",
-                    "original": original,
-                    "corrected": corrected,
-                    "reason": f"Posible falta de acento en '{original}' (contexto: pronombre/adverbio)",
-                    "pdf_reference": "Sección de acentuación"
-                })
-        
-        return corrections
\ No newline at end of file
+        return text, improvements
+    
+    def _find_grammar_issues(self, text: str) -> List[Dict[str, Any]]:
+        """Find grammar issues (placeholder implementation)"""
+        return find_corrections(text, _GRAMMAR_PATTERN, GRAMMAR_RULES)
\ No newline at end of file
@@ -0,0 +1,238 @@
+"""Memory-mapped Spanish lexicon: word frequency ranks and plain-language substitutions.
+
+The source lists in data/lexicon are compiled into a binary open-addressing hash
+table that is memory-mapped read-only, so every process shares the same pages
+and each lookup is O(1). Rebuild with: python -m agents.lexicon
+"""
+import mmap
+import os
+import struct
+import tempfile
+import threading
+from typing import Dict, List, Any, Optional, Sequence, Tuple
+
+LEXICON_DIR = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "data", "lexicon")
+FREQUENCIES_PATH = os.path.join(LEXICON_DIR, "frequencies_es.txt")
+SUBSTITUTIONS_PATH = os.path.join(LEXICON_DIR, "plain_language_es.tsv")
+INDEX_PATH = os.path.join(LEXICON_DIR, "lexicon.idx")
+
+# Words at least this long that are not among the common words are considered complex
+COMPLEX_WORD_LENGTH = 12
+
+_MAGIC = b"ACLX"
+_FORMAT_VERSION = 1
+# magic, version, slot count, multiword section offset, multiword section length
+_HEADER = struct.Struct("<4sIIII")
+# key hash, key offset, key length, substitution length, substitution offset, frequency rank
+_SLOT = struct.Struct("<QIHHII")
+
+_FNV_OFFSET = 0xcbf29ce484222325
+_FNV_PRIME = 0x100000001b3
+
+def _fnv1a(data: bytes) -> int:
+    """64-bit FNV-1a hash, stable across processes (unlike hash())"""
+    h = _FNV_OFFSET
+    for byte in data:
+        h = ((h ^ byte) * _FNV_PRIME) & 0xFFFFFFFFFFFFFFFF
+    return h or 1  # 0 marks an empty slot
+
+def _read_sources(frequencies_path: str, substitutions_path: str) -> Dict[str, List[Any]]:
+    """Merge frequency ranks and substitutions into {key: [rank, substitution]}"""
+    entries: Dict[str, List[Any]] = {}
+    with open(frequencies_path, "r", encoding="utf-8") as f:
+        rank = 0
+        for line in f:
+            word = line.strip().lower()
+            if not word or word.startswith("#"):
+                continue
+            rank += 1
+            if word not in entries:
+                entries[word] = [rank, None]
+    with open(substitutions_path, "r", encoding="utf-8") as f:
+        for line in f:
+            if not line.strip() or line.startswith("#"):
+                continue
+            term, substitution = line.rstrip("\n").split("\t")
+            entry = entries.setdefault(term.strip().lower(), [0, None])
+            entry[1] = substitution.strip()
+    return entries
+
+def build_index(index_path: str = INDEX_PATH, frequencies_path: str = FREQUENCIES_PATH,
+                substitutions_path: str = SUBSTITUTIONS_PATH) -> str:
+    """Compile the source lists into the binary index file"""
+    entries = _read_sources(frequencies_path, substitutions_path)
+
+    n_slots = 1
+    while n_slots < len(entries) * 2:
+        n_slots <<= 1
+    mask = n_slots - 1
+
+    pool = bytearray()
+    slots = [None] * n_slots
+    strings_base = _HEADER.size + n_slots * _SLOT.size
+    for key, (rank, substitution) in entries.items():
+        key_bytes = key.encode("utf-8")
+        sub_bytes = (substitution or "").encode("utf-8")
+        key_offset = strings_base + len(pool)
+        pool += key_bytes
+        sub_offset = strings_base + len(pool)
+        pool += sub_bytes
+
+        h = _fnv1a(key_bytes)
+        i = h & mask
+        while slots[i] is not None:
+            i = (i + 1) & mask
+        slots[i] = (h, key_offset, len(key_bytes), len(sub_bytes), sub_offset, rank)
+
+    multiword = "\n".join(key for key in entries if " " in key).encode("utf-8")
+    multiword_offset = strings_base + len(pool)
+
+    data = bytearray(_HEADER.pack(_MAGIC, _FORMAT_VERSION, n_slots, multiword_offset, len(multiword)))
+    for slot in slots:
+        data += _SLOT.pack(*(slot or (0, 0, 0, 0, 0, 0)))
+    data += pool
+    data += multiword
+
+    directory = os.path.dirname(index_path) or "."
+    fd, tmp_path = tempfile.mkstemp(dir=directory, suffix=".tmp")
+    with os.fdopen(fd, "wb") as f:
+        f.write(data)
+    os.chmod(tmp_path, 0o644)
+    os.replace(tmp_path, index_path)
+    return index_path
+
+class Lexicon:
+    """Read-only view over a memory-mapped lexicon index"""
+
+    def __init__(self, index_path: str = INDEX_PATH):
+        self.index_path = index_path
+        with open(index_path, "rb") as f:
+            self._buffer = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+
+        magic, version, n_slots, mw_offset, mw_length = _HEADER.unpack_from(self._buffer, 0)
+        if magic != _MAGIC or version != _FORMAT_VERSION:
+            raise ValueError(f"Índice de léxico no válido: {index_path}")
+        self._mask = n_slots - 1
+
+        # Trie over multiword expressions: {word: {word: ..., None: key}}
+        self._trie: Dict[Optional[str], Any] = {}
+        self.max_expression_words = 1
+        multiword = self._buffer[mw_offset:mw_offset + mw_length].decode("utf-8")
+        for expression in filter(None, multiword.split("\n")):
+            node = self._trie
+            words = expression.split(" ")
+            for word in words:
+                node = node.setdefault(word, {})
+            node[None] = expression
+            self.max_expression_words = max(self.max_expression_words, len(words))
+
+    def lookup(self, word: str) -> Optional[Tuple[int, Optional[str]]]:
+        """Return (frequency rank, substitution) for a word or expression, or None"""
+        key = word.lower().encode("utf-8")
+        h = _fnv1a(key)
+        i = h & self._mask
+        while True:
+            slot_hash, key_offset, key_length, sub_length, sub_offset, rank = _SLOT.unpack_from(
+                self._buffer, _HEADER.size + i * _SLOT.size
+            )
+            if slot_hash == 0:
+                return None
+            if slot_hash == h and self._buffer[key_offset:key_offset + key_length] == key:
+                substitution = self._buffer[sub_offset:sub_offset + sub_length].decode("utf-8")
+                return rank, substitution or None
+            i = (i + 1) & self._mask
+
+    def rank(self, word: str) -> int:
+        """Frequency rank of a word (1 = most common), 0 when unknown"""
+        entry = self.lookup(word)
+        return entry[0] if entry else 0
+
+    def substitution(self, word: str) -> Optional[str]:
+        """Plain-language alternative for a word or expression"""
+        entry = self.lookup(word)
+        return entry[1] if entry else None
+
+    def is_complex(self, word: str) -> bool:
+        """Whether a word is jargon or a long, uncommon word"""
+        entry = self.lookup(word)
+        if entry and entry[1]:
+            return True
+        return len(word) >= COMPLEX_WORD_LENGTH and not (entry and entry[0])
+
+    def find_substitutions(self, tokens: Sequence) -> List[Dict[str, Any]]:
+        """Find jargon in a token stream, preferring the longest multiword expression"""
+        matches = []
+        i = 0
+        while i < len(tokens):
+            match_end, expression = self._match_expression(tokens, i)
+            if expression is None:
+                substitution = self.substitution(tokens[i].lower)
+                if substitution:
+                    match_end, expression = i + 1, tokens[i].lower
+            if expression is None:
+                i += 1
+                continue
+            matches.append({
+                "term": expression,
+                "substitution": self.substitution(expression),
+                "start": tokens[i].start,
+                "end": tokens[match_end - 1].end,
+                "sentence": tokens[i].sentence
+            })
+            i = match_end
+        return matches
+
+    def _match_expression(self, tokens: Sequence, i: int) -> Tuple[int, Optional[str]]:
+        """Longest multiword expression starting at token i within one sentence"""
+        node = self._trie
+        best_end, best = i, None
+        j = i
+        while j < len(tokens) and tokens[j].sentence == tokens[i].sentence:
+            node = node.get(tokens[j].lower)
+            if node is None:
+                break
+            j += 1
+            if None in node:
+                best_end, best = j, node[None]
+        return best_end, best
+
+_lexicon: Optional[Lexicon] = None
+_lexicon_lock = threading.Lock()
+
+def _index_is_stale(index_path: str) -> bool:
+    if not os.path.exists(index_path):
+        return True
+    index_mtime = os.path.getmtime(index_path)
+    return any(os.path.getmtime(path) > index_mtime for path in (FREQUENCIES_PATH, SUBSTITUTIONS_PATH))
+
+def source_fingerprint() -> str:
+    """Version of the lexicon sources, changing whenever a source file is edited"""
+    parts = []
+    for path in (FREQUENCIES_PATH, SUBSTITUTIONS_PATH):
+        try:
+            stat = os.stat(path)
+            parts.append(f"{stat.st_mtime_ns}-{stat.st_size}")
+        except OSError:
+            parts.append("missing")
+    return ":".join(parts)
+
+def get_lexicon() -> Lexicon:
+    """Return the process-wide lexicon, building the index on first use if needed"""
+    global _lexicon
+    if _lexicon is None:
+        with _lexicon_lock:
+            if _lexicon is None:
+                index_path = os.environ.get("ACLARADOR_LEXICON_INDEX", INDEX_PATH)
+                if _index_is_stale(index_path):
+                    try:
+                        build_index(index_path)
+                    except OSError:
+                        # Read-only deployments fall back to a private temporary index
+                        index_path = os.path.join(tempfile.gettempdir(), "aclarador_lexicon.idx")
+                        if _index_is_stale(index_path):
+                            build_index(index_path)
+                _lexicon = Lexicon(index_path)
+    return _lexicon
+
+if __name__ == "__main__":
+    print(f"Índice generado en {build_index()}")
\ No newline at end of file
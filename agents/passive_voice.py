@@ -0,0 +1,114 @@
+from typing import Dict, List, Any
+from .tokenizer import tokenize, sentence_spans
+
+# Forms of "ser" and "estar" that introduce a periphrastic passive
+AUXILIARY_FORMS = frozenset([
+    "ser", "es", "son", "era", "eran", "fue", "fueron", "será", "serán", "sería", "serían",
+    "sea", "sean", "fuera", "fueran", "fuese", "fuesen", "sido", "siendo",
+    "estar", "está", "están", "estaba", "estaban", "estuvo", "estuvieron", "estará",
+    "estarán", "estaría", "estarían", "esté", "estén", "estado", "estando"
+])
+
+# Regular participle endings, longest first
+PARTICIPLE_SUFFIXES = ("ados", "adas", "idos", "idas", "ado", "ada", "ido", "ida")
+
+IRREGULAR_PARTICIPLES = frozenset(
+    stem + ending
+    for stem in [
+        "hech", "dich", "escrit", "vist", "puest", "abiert", "vuelt", "rot", "muert",
+        "cubiert", "resuelt", "impres", "provist", "devuelt", "descrit", "inscrit",
+        "previst", "dispuest", "propuest", "compuest", "expuest", "impuest", "supuest",
+        "satisfech", "deshech", "frit", "absuelt", "envuelt", "revuelt", "suscrit"
+    ]
+    for ending in ("o", "a", "os", "as")
+)
+
+# Words with participle endings that are usually nouns or adjectives after "ser/estar"
+NON_PARTICIPLES = frozenset([
+    "lado", "lados", "estado", "estados", "pasado", "cuidado", "mercado", "grado", "grados",
+    "soldado", "abogado", "abogada", "pecado", "helado", "nada", "cada", "todo", "vida",
+    "vidas", "comida", "salida", "salidas", "medida", "medidas", "bebida", "partida",
+    "herida", "sentido", "partido", "partidos", "ruido", "nido", "olvido", "apellido",
+    "contenido", "contenidos", "seguida", "entrada", "entradas", "llegada", "mirada",
+    "jornada", "temporada", "década", "parada", "tirada", "ciudad", "idea", "madera"
+])
+
+# Tokens allowed between the auxiliary and the participle ("fue rápidamente aprobada")
+INTERVENING_WORDS = frozenset([
+    "ya", "muy", "también", "no", "siempre", "nunca", "bien", "mal", "todavía", "aún",
+    "sido", "siendo", "estado", "previamente", "finalmente"
+])
+
+# Third-person verb endings for "se" + verb (pasiva refleja), longest first
+REFLEXIVE_VERB_SUFFIXES = (
+    "aron", "ieron", "aban", "ían", "arán", "erán", "irán", "aría", "ería", "iría",
+    "aba", "ía", "ará", "erá", "irá", "an", "en", "ó", "a", "e"
+)
+
+# Pronouns that make "se" a dative or reflexive clitic rather than a passive marker
+CLITICS = frozenset(["lo", "la", "los", "las", "le", "les", "me", "te", "nos", "os"])
+
+MAX_INTERVENING = 2
+
+def is_participle(word: str) -> bool:
+    """Whether a lowercase token looks like a past participle"""
+    if word in IRREGULAR_PARTICIPLES:
+        return True
+    if word in NON_PARTICIPLES or len(word) < 5:
+        return False
+    return word.endswith(PARTICIPLE_SUFFIXES)
+
+def _is_reflexive_passive_verb(word: str) -> bool:
+    if word in CLITICS or len(word) < 4:
+        return False
+    return word.endswith(REFLEXIVE_VERB_SUFFIXES)
+
+def detect_passive_voice(text: str) -> List[Dict[str, Any]]:
+    """Find passive constructions in one pass over the shared token stream"""
+    tokens = tokenize(text)
+    spans = sentence_spans(text)
+    detections = []
+    auxiliary = None  # index of a pending "ser/estar" token
+    last_sentence = -1
+
+    for i, token in enumerate(tokens):
+        word = token.lower
+        kind = None
+        start_index = None
+
+        if auxiliary is not None and tokens[auxiliary].sentence == token.sentence and is_participle(word) \
+                and word not in INTERVENING_WORDS:
+            kind, start_index = "periphrastic", auxiliary
+            auxiliary = None
+        elif word in AUXILIARY_FORMS:
+            if auxiliary is None or tokens[auxiliary].sentence != token.sentence or word not in INTERVENING_WORDS:
+                auxiliary = i
+        elif auxiliary is not None and (word in INTERVENING_WORDS or word.endswith("mente")) \
+                and i - auxiliary <= MAX_INTERVENING:
+            pass
+        else:
+            auxiliary = None
+
+        if kind is None and i > 0 and tokens[i - 1].lower == "se" \
+                and tokens[i - 1].sentence == token.sentence and _is_reflexive_passive_verb(word):
+            kind, start_index = "reflexive", i - 1
+
+        # One detection per sentence is enough for sentence-level reporting
+        if kind is not None and token.sentence != last_sentence:
+            last_sentence = token.sentence
+            sentence_start, sentence_end = spans[token.sentence]
+            detections.append({
+                "kind": kind,
+                "construction": text[tokens[start_index].start:token.end],
+                "start": tokens[start_index].start,
+                "end": token.end,
+                "sentence": token.sentence,
+                "sentence_start": sentence_start,
+                "sentence_end": sentence_end
+            })
+
+    return detections
+
+def has_passive_voice(text: str) -> bool:
+    """Whether the text contains at least one passive construction"""
+    return bool(detect_passive_voice(text))
\ No newline at end of file
@@ -0,0 +1,101 @@
+"""Spanish readability metrics: Fernández-Huerta and Szigriszt-Pazos (INFLESZ)."""
+from collections import Counter
+from functools import lru_cache
+from typing import Dict, Any
+from .tokenizer import words, sentence_spans
+
+# Bounded cache of word -> syllable count, shared by every agent in the process
+SYLLABLE_CACHE_SIZE = 65536
+
+STRONG_VOWELS = frozenset("aeoáéó")
+WEAK_VOWELS = frozenset("iuü")
+ACCENTED_WEAK_VOWELS = frozenset("íú")
+VOWELS = STRONG_VOWELS | WEAK_VOWELS | ACCENTED_WEAK_VOWELS
+
+# INFLESZ scale for the Szigriszt-Pazos index (lower bound, label)
+INFLESZ_LEVELS = [
+    (80, "muy fácil"),
+    (65, "bastante fácil"),
+    (55, "normal"),
+    (40, "algo difícil"),
+    (float("-inf"), "muy difícil")
+]
+
+@lru_cache(maxsize=SYLLABLE_CACHE_SIZE)
+def count_syllables(word: str) -> int:
+    """Count the syllables of a lowercase Spanish word"""
+    nuclei = 0
+    previous = None  # previous vowel in the current vowel group
+    length = len(word)
+
+    for i, char in enumerate(word):
+        # Silent "u" in "que", "qui", "gue", "gui"
+        if char == "u" and i > 0 and word[i - 1] in "qg" and i + 1 < length and word[i + 1] in "eéií":
+            continue
+        # "y" is a vowel alone or at the end of a word ("hoy", "muy")
+        is_vowel = char in VOWELS or (char == "y" and (length == 1 or (i == length - 1 and previous)))
+        if not is_vowel:
+            previous = None
+            continue
+
+        vowel = "i" if char == "y" else char
+        if previous is None:
+            nuclei += 1
+        elif vowel in STRONG_VOWELS and previous in STRONG_VOWELS:
+            nuclei += 1  # hiatus between strong vowels ("le-er")
+        elif (vowel in ACCENTED_WEAK_VOWELS and previous in STRONG_VOWELS) or \
+                (previous in ACCENTED_WEAK_VOWELS and vowel in STRONG_VOWELS):
+            nuclei += 1  # accented weak vowel next to a strong one breaks the diphthong ("dí-a")
+        elif vowel == previous:
+            nuclei += 1  # repeated weak vowel ("chi-i-ta")
+        previous = vowel
+
+    return max(nuclei, 1)
+
+def text_statistics(text: str) -> Dict[str, int]:
+    """Count words, sentences and syllables of a text"""
+    word_counts = Counter(words(text))
+    # Syllabify each distinct word once and weight it by its frequency
+    syllables = sum(count_syllables(word) * count for word, count in word_counts.items())
+    return {
+        "words": sum(word_counts.values()),
+        "sentences": len(sentence_spans(text)),
+        "syllables": syllables
+    }
+
+def readability_from_statistics(stats: Dict[str, int]) -> Dict[str, Any]:
+    """Compute readability indices from word, sentence and syllable counts"""
+    n_words = stats["words"]
+    n_sentences = max(stats["sentences"], 1)
+    if n_words == 0:
+        return {
+            **stats,
+            "avg_sentence_length": 0.0,
+            "syllables_per_word": 0.0,
+            "fernandez_huerta": 0.0,
+            "szigriszt_pazos": 0.0,
+            "inflesz_level": "muy difícil"
+        }
+
+    syllables_per_word = stats["syllables"] / n_words
+    words_per_sentence = n_words / n_sentences
+
+    fernandez_huerta = 206.84 - 0.60 * (100 * syllables_per_word) - 1.02 * (100 / words_per_sentence)
+    szigriszt_pazos = 206.835 - 62.3 * syllables_per_word - words_per_sentence
+
+    return {
+        **stats,
+        "avg_sentence_length": words_per_sentence,
+        "syllables_per_word": syllables_per_word,
+        "fernandez_huerta": fernandez_huerta,
+        "szigriszt_pazos": szigriszt_pazos,
+        "inflesz_level": next(label for bound, label in INFLESZ_LEVELS if szigriszt_pazos >= bound)
+    }
+
+def compute_readability(text: str) -> Dict[str, Any]:
+    """Readability indices and word/sentence statistics for a text"""
+    return readability_from_statistics(text_statistics(text))
+
+def normalized_readability(metrics: Dict[str, Any]) -> float:
+    """Map the Szigriszt-Pazos index to a 0-1 score"""
+    return min(max(metrics["szigriszt_pazos"] / 100.0, 0.0), 1.0)
@@ -0,0 +1,161 @@
+from typing import Dict, List, Any, Optional
+from .base_agent import BaseAgent
+
+# Extra cost charged to LLM-backed agents so heuristics win when both cover an issue
+LLM_COST_PENALTY_MS = 1000.0
+
+class AgentRegistry:
+    """Registry of pluggable agents with cost-aware routing"""
+
+    def __init__(self):
+        self._agents: Dict[str, BaseAgent] = {}
+        self._order: List[str] = []
+
+    def register(self, key: str, agent: BaseAgent) -> BaseAgent:
+        """Register an agent under a routing key"""
+        if key not in self._agents:
+            self._order.append(key)
+        self._agents[key] = agent
+        return agent
+
+    def unregister(self, key: str):
+        """Remove an agent from the registry"""
+        if key in self._agents:
+            del self._agents[key]
+            self._order.remove(key)
+
+    def get(self, key: str) -> Optional[BaseAgent]:
+        return self._agents.get(key)
+
+    def keys(self) -> List[str]:
+        return list(self._order)
+
+    def describe(self) -> Dict[str, Dict[str, Any]]:
+        """Return routing metadata for every registered agent"""
+        return {
+            key: {
+                "description": agent.description,
+                "capabilities": agent.get_capabilities(),
+                "uses_llm": agent.uses_llm,
+                "expected_latency_ms": agent.expected_latency_ms,
+                "dependencies": list(agent.dependencies),
+                "handles_issues": list(agent.handles_issues),
+            }
+            for key, agent in self._agents.items()
+        }
+
+    def estimated_cost(self, key: str) -> float:
+        """Estimated cost of running an agent, in latency milliseconds"""
+        agent = self._agents[key]
+        cost = agent.expected_latency_ms
+        if agent.uses_llm:
+            cost += LLM_COST_PENALTY_MS
+        return cost
+
+    def plan(self, issues: List[str], analysis: Dict[str, Any] = None,
+             latency_budget_ms: float = None) -> List[str]:
+        """Pick the cheapest set of agents covering the detected issues within the latency budget"""
+        analysis = analysis or {}
+        selected: List[str] = []
+        spent = 0.0
+        # Mandatory agents come first but still count toward the budget: one that
+        # does not fit (e.g. the LLM rewriter under a tight budget) is skipped
+        for key in self._order:
+            if not (self._agents[key].always_run and self._agents[key].applies_to(analysis)):
+                continue
+            extra = [k for k in self._closure([key]) if k not in selected]
+            extra_latency = sum(self._agents[k].expected_latency_ms for k in extra)
+            if latency_budget_ms is not None and spent + extra_latency > latency_budget_ms:
+                continue
+            selected.extend(extra)
+            spent += extra_latency
+
+        uncovered = set(issues)
+        for key in selected:
+            uncovered -= set(self._agents[key].handles_issues)
+
+        candidates = [
+            key for key in self._order
+            if key not in selected
+            and self._agents[key].handles_issues
+            and self._agents[key].applies_to(analysis)
+        ]
+
+        # Greedy weighted set cover: cheapest cost per newly covered issue first
+        while uncovered and candidates:
+            best_key, best_ratio, best_extra = None, None, None
+            for key in candidates:
+                covered = uncovered & set(self._agents[key].handles_issues)
+                if not covered:
+                    continue
+                extra = [k for k in self._closure([key]) if k not in selected]
+                ratio = sum(self.estimated_cost(k) for k in extra) / len(covered)
+                if best_ratio is None or ratio < best_ratio:
+                    best_key, best_ratio, best_extra = key, ratio, extra
+            if best_key is None:
+                break
+
+            candidates.remove(best_key)
+            extra_latency = sum(self._agents[k].expected_latency_ms for k in best_extra)
+            if latency_budget_ms is not None and spent + extra_latency > latency_budget_ms:
+                continue
+
+            selected.extend(best_extra)
+            spent += extra_latency
+            for key in best_extra:
+                uncovered -= set(self._agents[key].handles_issues)
+
+        return self.order(selected)
+
+    def resolve(self, requested: List[str], analysis: Dict[str, Any] = None) -> List[str]:
+        """Expand an explicit agent selection with its dependencies"""
+        # Explicit selections are honored as given: always_run only applies to planning
+        keys = [key for key in requested if key in self._agents]
+        return self.order(self._closure(keys))
+
+    def order(self, keys: List[str]) -> List[str]:
+        """Order agents by stage, running dependencies before dependents"""
+        ordered = []
+        visiting = set()
+
+        def visit(key):
+            if key in ordered or key in visiting:
+                return
+            visiting.add(key)
+            for dependency in self._agents[key].dependencies:
+                if dependency in keys:
+                    visit(dependency)
+            visiting.discard(key)
+            ordered.append(key)
+
+        for key in sorted(set(keys), key=lambda k: (self._agents[k].stage, self._order.index(k))):
+            visit(key)
+        return ordered
+
+    def _closure(self, keys: List[str]) -> List[str]:
+        """Return the keys plus all their transitive dependencies"""
+        result = []
+        pending = list(keys)
+        while pending:
+            key = pending.pop(0)
+            if key in result or key not in self._agents:
+                continue
+            result.append(key)
+            pending.extend(self._agents[key].dependencies)
+        return result
+
+def build_default_registry() -> AgentRegistry:
+    """Create a registry with the built-in processing agents"""
+    from .rewriter_agent import RewriterAgent
+    from .grammar_agent import GrammarAgent
+    from .style_agent import StyleAgent
+    from .seo_agent import SEOAgent
+    from .validator_agent import ValidatorAgent
+
+    registry = AgentRegistry()
+    registry.register("rewriter", RewriterAgent())
+    registry.register("grammar", GrammarAgent())
+    registry.register("style", StyleAgent())
+    registry.register("seo", SEOAgent())
+    registry.register("validator", ValidatorAgent())
+    return registry
\ No newline at end of file
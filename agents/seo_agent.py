@@ -1,17 +1,53 @@
-from typing import Dict, List, Any
+from typing import Dict, List, Any, Tuple
 from .base_agent import BaseAgent
 
 class SEOAgent(BaseAgent):
     """Agent for SEO optimization while maintaining clarity"""
-    
+
+    description = "Optimizes for search engines while maintaining clarity"
+    expected_latency_ms = 5.0
+    handles_issues = ["web_content"]
+    shardable = True
+
     def __init__(self):
         super().__init__("SEO")
     
     def analyze(self, text: str, context: Dict[str, Any] = None) -> Dict[str, Any]:
         """Analyze SEO aspects while preserving clarity"""
+        return self.merge_shards(text, [self.analyze_shard(text)], [0], context)
+    
+    def analyze_shard(self, text: str) -> Dict[str, Any]:
+        # Check for title-like content (first sentence)
+        first_sentence = text.split('.')[0] if '.' in text else text
+        
+        # Count longer words for keyword repetition
+        word_freq = {}
+        for word in text.lower().split():
+            if len(word) > 4:  # Only consider longer words
+                word_freq[word] = word_freq.get(word, 0) + 1
+        
+        sentences = [s.strip() for s in text.split('.') if s.strip()]
         return {
-            "seo_recommendations": self._analyze_seo_elements(text),
-            "clarity_balance": self._assess_clarity_balance(text),
+            "first_sentence_words": len(first_sentence.split()),
+            "word_freq": word_freq,
+            "sentence_words": sum(len(s.split()) for s in sentences),
+            "sentences": len(sentences)
+        }
+    
+    def merge_shards(self, text: str, partials: List[Dict[str, Any]], offsets: List[int],
+                     context: Dict[str, Any] = None) -> Dict[str, Any]:
+        # Merging in document order keeps words in order of first appearance
+        word_freq = {}
+        for partial in partials:
+            for word, freq in partial["word_freq"].items():
+                word_freq[word] = word_freq.get(word, 0) + freq
+        
+        return {
+            "seo_recommendations": self._analyze_seo_elements(partials[0]["first_sentence_words"], word_freq),
+            "clarity_balance": self._assess_clarity_balance(
+                sum(partial["sentence_words"] for partial in partials),
+                sum(partial["sentences"] for partial in partials)
+            ),
             "agent": self.name
         }
     
@@ -23,13 +59,29 @@ class SEOAgent(BaseAgent):
             "search_intent_preservation"
         ]
     
-    def _analyze_seo_elements(self, text: str) -> List[Dict[str, str]]:
+    def applies_to(self, analysis: Dict[str, Any]) -> bool:
+        """SEO recommendations only make sense for web content"""
+        return analysis.get("text_type") == "web"
+    
+    def merge_result(self, text: str, result: Dict[str, Any]) -> Tuple[str, List[Dict[str, Any]]]:
+        """Report SEO recommendations"""
+        improvements = [
+            {
+                "agent": "seo",
+                "type": rec["type"],
+                "recommendation": rec["recommendation"],
+                "reason": rec["reason"],
+                "reference": rec.get("pdf_reference", "")
+            }
+            for rec in result.get("seo_recommendations", [])
+        ]
+        return text, improvements
+    
+    def _analyze_seo_elements(self, first_sentence_words: int, word_freq: Dict[str, int]) -> List[Dict[str, str]]:
         """Analyze SEO elements"""
         recommendations = []
         
-        # Check for title-like content (first sentence)
-        first_sentence = text.split('.')[0] if '.' in text else text
-        if len(first_sentence.split()) > 10:
+        if first_sentence_words > 10:
             recommendations.append({
                 "type": "seo",
                 "element": "title",
@@ -39,12 +91,6 @@ class SEOAgent(BaseAgent):
             })
         
         # Check for keyword repetition
-        words = text.lower().split()
-        word_freq = {}
-        for word in words:
-            if len(word) > 4:  # Only consider longer words
-                word_freq[word] = word_freq.get(word, 0) + 1
-        
         repeated_words = [word for word, freq in word_freq.items() if freq > 3]
         if repeated_words:
             recommendations.append({
@@ -57,11 +103,10 @@ class SEOAgent(BaseAgent):
         
         return recommendations
     
-    def _assess_clarity_balance(self, text: str) -> Dict[str, float]:
+    def _assess_clarity_balance(self, sentence_words: int, sentences: int) -> Dict[str, float]:
         """Assess balance between SEO and clarity"""
         # Simple metrics for demonstration
-        sentences = [s.strip() for s in text.split('.') if s.strip()]
-        avg_length = sum(len(s.split()) for s in sentences) / len(sentences) if sentences else 0
+        avg_length = sentence_words / sentences if sentences else 0
         
         return {
             "seo_score": 0.7,  # Placeholder
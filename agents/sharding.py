@@ -0,0 +1,149 @@
+"""Sharded execution of the heuristic agents for very long documents.
+
+The document is split at sentence ends into shards of roughly equal size. The
+UTF-8 text is written once to a shared-memory block, and the worker processes
+read their byte range from it. Each worker runs analyze_shard() of every agent
+in the pass on its shard, and merge_shards() combines the partials in the
+parent into the same result that a single-process analyze() would return.
+
+Workers load agents by import path, so any shardable agent class can run there
+as long as it can be constructed without arguments.
+
+The job workers enable it with ACLARADOR_SHARD_WORKERS (number of processes)
+and optionally ACLARADOR_SHARD_MIN_CHARS (documents shorter than this stay
+in-process); see executor_from_env().
+"""
+import importlib
+import os
+import re
+from concurrent.futures import ProcessPoolExecutor
+from multiprocessing import shared_memory
+from typing import Dict, List, Any, Optional, Tuple
+
+# Environment variables read by executor_from_env()
+SHARD_WORKERS_ENV = "ACLARADOR_SHARD_WORKERS"
+SHARD_MIN_CHARS_ENV = "ACLARADOR_SHARD_MIN_CHARS"
+
+# Documents shorter than this are analyzed in-process
+MIN_SHARDED_CHARS = 200_000
+# Target shard size; about four shards per worker keeps the pool balanced
+SHARD_CHARS = 50_000
+
+# A run of sentence punctuation ending in "." and followed by whitespace. Cutting
+# there is safe for agents that split on "." as well as for sentence_spans()
+_SHARD_BOUNDARY = re.compile(r"[.!?]*\.(?=\s)")
+
+def shard_spans(text: str, shard_chars: int = SHARD_CHARS) -> List[Tuple[int, int]]:
+    """[start, end) offsets of sentence-aligned shards covering the whole text"""
+    spans = []
+    start = 0
+    while len(text) - start > shard_chars:
+        match = _SHARD_BOUNDARY.search(text, start + shard_chars)
+        if match is None:
+            break
+        spans.append((start, match.end()))
+        start = match.end()
+    spans.append((start, len(text)))
+    return spans
+
+# Agent instances of a worker process, by import path
+_worker_agents: Dict[str, Any] = {}
+
+def agent_path(agent) -> str:
+    """Import path of an agent's class, used to rebuild it in worker processes"""
+    return f"{type(agent).__module__}:{type(agent).__qualname__}"
+
+def _worker_agent(path: str):
+    agent = _worker_agents.get(path)
+    if agent is None:
+        module_name, class_name = path.split(":")
+        agent = _worker_agents[path] = getattr(importlib.import_module(module_name), class_name)()
+    return agent
+
+def _analyze_shard(shm_name: str, byte_start: int, byte_end: int,
+                   agent_paths: Dict[str, str]) -> Dict[str, Dict[str, Any]]:
+    """Worker entry point: analyze one shard read from shared memory"""
+
+    # Workers share the parent's resource tracker; the parent unlinks the block
+    shm = shared_memory.SharedMemory(name=shm_name)
+    try:
+        text = bytes(shm.buf[byte_start:byte_end]).decode("utf-8")
+    finally:
+        shm.close()
+
+    return {key: _worker_agent(path).analyze_shard(text) for key, path in agent_paths.items()}
+
+class ShardedExecutor:
+    """Runs shardable agents over shards of a long document in a process pool"""
+
+    def __init__(self, max_workers: Optional[int] = None, shard_chars: int = SHARD_CHARS,
+                 min_chars: int = MIN_SHARDED_CHARS):
+        self.max_workers = max_workers or os.cpu_count() or 1
+        self.shard_chars = shard_chars
+        self.min_chars = min_chars
+        self._pool: Optional[ProcessPoolExecutor] = None
+
+    def should_shard(self, agent, text: str) -> bool:
+        return agent.shardable and len(text) >= self.min_chars
+
+    def analyze(self, agents: Dict[str, Any], text: str,
+                context: Dict[str, Any] = None) -> Dict[str, Dict[str, Any]]:
+        """Analyze the text with several agents in one sharded pass"""
+        sharded = self.analyze_shards(agents, text)
+        return {
+            key: agent.merge_shards(text, sharded[key][0], sharded[key][1], context)
+            for key, agent in agents.items()
+        }
+
+    def analyze_shards(self, agents: Dict[str, Any],
+                       text: str) -> Dict[str, Tuple[List[Dict[str, Any]], List[int]]]:
+        """Shard partials and their offsets for several agents, from one shared-memory pass"""
+        # Merging is left to the caller, which may only have an agent's context later
+        spans = shard_spans(text, self.shard_chars)
+        if len(spans) == 1:
+            return {key: ([agent.analyze_shard(text)], [0]) for key, agent in agents.items()}
+
+        data = text.encode("utf-8")
+        # Byte range of each shard within the encoded buffer
+        byte_offsets = []
+        position = 0
+        for start, end in spans:
+            byte_start = position
+            position += len(text[start:end].encode("utf-8"))
+            byte_offsets.append((byte_start, position))
+
+        shm = shared_memory.SharedMemory(create=True, size=max(len(data), 1))
+        try:
+            shm.buf[:len(data)] = data
+            paths = {key: agent_path(agent) for key, agent in agents.items()}
+            futures = [
+                self._get_pool().submit(_analyze_shard, shm.name, byte_start, byte_end, paths)
+                for byte_start, byte_end in byte_offsets
+            ]
+            partials = [future.result() for future in futures]
+        finally:
+            shm.close()
+            shm.unlink()
+
+        offsets = [start for start, _ in spans]
+        return {key: ([partial[key] for partial in partials], offsets) for key in agents}
+
+    def shutdown(self):
+        if self._pool is not None:
+            self._pool.shutdown()
+            self._pool = None
+
+    def _get_pool(self) -> ProcessPoolExecutor:
+        if self._pool is None:
+            self._pool = ProcessPoolExecutor(max_workers=self.max_workers)
+        return self._pool
+
+def executor_from_env() -> Optional[ShardedExecutor]:
+    """Sharded executor configured by the environment, or None when sharding is off"""
+    workers = int(os.environ.get(SHARD_WORKERS_ENV) or 0)
+    if workers < 1:
+        return None
+    return ShardedExecutor(
+        max_workers=workers,
+        min_chars=int(os.environ.get(SHARD_MIN_CHARS_ENV) or MIN_SHARDED_CHARS)
+    )
\ No newline at end of file
@@ -1,23 +1,63 @@
-from typing import Dict, List, Any
-from .base_agent import BaseAgent
+from typing import Dict, List, Any, Tuple
+from .base_agent import BaseAgent, offset_spans
+from .corrections import match_case
+from .lexicon import get_lexicon, source_fingerprint
+from .passive_voice import detect_passive_voice
+from .readability import (
+    compute_readability,
+    normalized_readability,
+    readability_from_statistics,
+    text_statistics
+)
+from .tokenizer import tokenize
 
 class StyleAgent(BaseAgent):
     """Agent for style improvements and coherence"""
-    
+
+    description = "Suggests style improvements for clarity"
+    expected_latency_ms = 10.0
+    handles_issues = ["long_sentence", "complex_vocabulary", "passive_voice"]
+    shardable = True
+
     def __init__(self):
         super().__init__("Style")
     
     def analyze(self, text: str, context: Dict[str, Any] = None) -> Dict[str, Any]:
         """Analyze style and suggest improvements"""
-        improvements = self._find_style_issues(text)
+        return self.merge_shards(text, [self.analyze_shard(text)], [0], context)
+    
+    def analyze_shard(self, text: str) -> Dict[str, Any]:
+        return {
+            "long_sentences": self._long_sentences(text),
+            "passive_voice": self._passive_constructions(text),
+            "vocabulary": self._vocabulary_substitutions(text),
+            "statistics": text_statistics(text)
+        }
+    
+    def merge_shards(self, text: str, partials: List[Dict[str, Any]], offsets: List[int],
+                     context: Dict[str, Any] = None) -> Dict[str, Any]:
+        # Same order as a single pass: long sentences, passive voice, vocabulary
+        improvements = []
+        for category in ("long_sentences", "passive_voice", "vocabulary"):
+            for partial, offset in zip(partials, offsets):
+                improvements.extend(offset_spans(partial[category], offset))
+        
+        statistics = {
+            key: sum(partial["statistics"][key] for partial in partials)
+            for key in ("words", "sentences", "syllables")
+        }
         
         # Add knowledge base guidelines if available
         kb_guidelines = []
         if context and context.get("knowledge_retrieval"):
             try:
-                issues = ["long_sentence"] if any(len(s.split()) > 30 for s in text.split('.')) else []
-                if any(indicator in text.lower() for indicator in ["fue", "fueron", "es", "son"]):
+                issues = []
+                if any(partial["long_sentences"] for partial in partials):
+                    issues.append("long_sentence")
+                if any(partial["passive_voice"] for partial in partials):
                     issues.append("passive_voice")
+                if any(partial["vocabulary"] for partial in partials):
+                    issues.append("complex_vocabulary")
                 
                 kb_guidelines = context["knowledge_retrieval"].get_relevant_guidelines(
                     text=text,
@@ -28,13 +68,19 @@ class StyleAgent(BaseAgent):
             except Exception as e:
                 print(f"Error retrieving style guidelines: {e}")
         
+        readability = readability_from_statistics(statistics)
+        
         return {
             "improvements": improvements,
-            "readability_score": self._calculate_readability(text),
+            "readability_score": normalized_readability(readability),
+            "readability_metrics": readability,
             "agent": self.name,
             "kb_guidelines": kb_guidelines
         }
     
+    def cache_fingerprint(self) -> str:
+        return f"{super().cache_fingerprint()}:lexicon={source_fingerprint()}"
+    
     def get_capabilities(self) -> List[str]:
         return [
             "sentence_simplification",
@@ -43,8 +89,32 @@ class StyleAgent(BaseAgent):
             "readability_enhancement"
         ]
     
-    def _find_style_issues(self, text: str) -> List[Dict[str, str]]:
+    def merge_result(self, text: str, result: Dict[str, Any]) -> Tuple[str, List[Dict[str, Any]]]:
+        """Report style recommendations (not automatic corrections)"""
+        improvements = [
+            {
+                "agent": "style",
+                "type": improvement["type"],
+                "suggestion": (
+                    f"{improvement['original']} → {improvement['corrected']}"
+                    if improvement["type"] == "vocabulary" else improvement["corrected"]
+                ),
+                "reason": improvement["reason"],
+                "reference": improvement.get("pdf_reference", "")
+            }
+            for improvement in result.get("improvements", [])
+        ]
+        return text, improvements
+    
+    def _find_style_issues(self, text: str) -> List[Dict[str, Any]]:
         """Find style issues and suggest improvements"""
+        return (
+            self._long_sentences(text)
+            + self._passive_constructions(text)
+            + self._vocabulary_substitutions(text)
+        )
+    
+    def _long_sentences(self, text: str) -> List[Dict[str, Any]]:
         improvements = []
         sentences = [s.strip() for s in text.split('.') if s.strip()]
         
@@ -60,36 +130,44 @@ class StyleAgent(BaseAgent):
                     "reason": f"Oración muy larga ({word_count} palabras). Máximo recomendado: 30 palabras.",
                     "pdf_reference": "Principios de lenguaje claro - Una idea por oración"
                 })
-            
-            # Check for passive voice (basic detection)
-            passive_indicators = ["fue", "fueron", "es", "son", "está siendo", "han sido"]
-            if any(indicator in sentence.lower() for indicator in passive_indicators):
-                improvements.append({
-                    "type": "style",
-                    "original": sentence,
-                    "corrected": "[Convertir a voz activa]",
-                    "reason": "Posible uso de voz pasiva. Preferir voz activa para mayor claridad.",
-                    "pdf_reference": "Estructura clara - Sujeto, verbo, predicado"
-                })
         
         return improvements
     
-    def _calculate_readability(self, text: str) -> float:
-        """Calculate basic readability score"""
-        sentences = len([s for s in text.split('.') if s.strip()])
-        words = len(text.split())
+    def _passive_constructions(self, text: str) -> List[Dict[str, Any]]:
+        improvements = []
         
-        if sentences == 0:
-            return 0.0
+        # Passive constructions (ser/estar + participle, pasiva refleja)
+        for detection in detect_passive_voice(text):
+            improvements.append({
+                "type": "style",
+                "original": text[detection["sentence_start"]:detection["sentence_end"]],
+                "corrected": "[Convertir a voz activa]",
+                "reason": f"Uso de voz pasiva ('{detection['construction']}'). Preferir voz activa para mayor claridad.",
+                "pdf_reference": "Estructura clara - Sujeto, verbo, predicado",
+                "start": detection["sentence_start"],
+                "end": detection["sentence_end"]
+            })
         
-        avg_sentence_length = words / sentences
+        return improvements
+    
+    def _vocabulary_substitutions(self, text: str) -> List[Dict[str, Any]]:
+        improvements = []
+        
+        # Concrete plain-language substitutions at token offsets
+        for match in get_lexicon().find_substitutions(tokenize(text)):
+            original = text[match["start"]:match["end"]]
+            improvements.append({
+                "type": "vocabulary",
+                "original": original,
+                "corrected": match_case(original, match["substitution"]),
+                "reason": f"'{original}' es jerga administrativa. Preferir palabras comunes y precisas.",
+                "pdf_reference": "Vocabulario claro - Sustituir palabras complejas por sinónimos simples",
+                "start": match["start"],
+                "end": match["end"]
+            })
         
-        # Simple readability score (inverse of complexity)
-        if avg_sentence_length <= 15:
-            return 0.9
-        elif avg_sentence_length <= 25:
-            return 0.7
-        elif avg_sentence_length <= 35:
-            return 0.5
-        else:
-            return 0.3
\ No newline at end of file
+        return improvements
+    
+    def _calculate_readability(self, text: str) -> float:
+        """Readability score (0-1) from the Szigriszt-Pazos index"""
+        return normalized_readability(compute_readability(text))
\ No newline at end of file
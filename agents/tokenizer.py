@@ -0,0 +1,60 @@
+import re
+from collections import namedtuple
+from functools import lru_cache
+from typing import List, Tuple
+
+# A word with its [start, end) offsets and the index of its sentence
+Token = namedtuple("Token", ["text", "lower", "start", "end", "sentence"])
+
+_WORD_PATTERN = re.compile(r"[^\W\d_]+(?:[-'][^\W\d_]+)*", re.UNICODE)
+_SENTENCE_END_PATTERN = re.compile(r"[.!?]+(?=\s|$)|\n\s*\n")
+
+# Token tuples take about 40 times the text's size and the cache lives for the
+# whole process, so it only keeps the few texts of the current request and skips
+# long documents (agents retokenize those, or each shard tokenizes its own slice)
+TOKEN_CACHE_SIZE = 4
+MAX_CACHED_CHARS = 100_000
+
+def tokenize(text: str) -> Tuple[Token, ...]:
+    """Split text into word tokens, shared by all agents analyzing the same text"""
+    if len(text) > MAX_CACHED_CHARS:
+        return _tokenize(text)
+    return _cached_tokenize(text)
+
+@lru_cache(maxsize=TOKEN_CACHE_SIZE)
+def _cached_tokenize(text: str) -> Tuple[Token, ...]:
+    return _tokenize(text)
+
+def _tokenize(text: str) -> Tuple[Token, ...]:
+    tokens = []
+    sentence_ends = [end for _, end in sentence_spans(text)]
+    sentence = 0
+    for match in _WORD_PATTERN.finditer(text):
+        while sentence < len(sentence_ends) - 1 and match.start() >= sentence_ends[sentence]:
+            sentence += 1
+        word = match.group()
+        tokens.append(Token(word, word.lower(), match.start(), match.end(), sentence))
+    return tuple(tokens)
+
+def words(text: str) -> List[str]:
+    """Lowercase words of a text, without offsets (fast path for statistics)"""
+    return _WORD_PATTERN.findall(text.lower())
+
+def sentence_spans(text: str) -> List[Tuple[int, int]]:
+    """Return [start, end) offsets of each non-empty sentence"""
+    spans = []
+    start = 0
+    for match in _SENTENCE_END_PATTERN.finditer(text):
+        if text[start:match.end()].strip():
+            spans.append(_strip_span(text, start, match.end()))
+        start = match.end()
+    if text[start:].strip():
+        spans.append(_strip_span(text, start, len(text)))
+    return spans
+
+def _strip_span(text: str, start: int, end: int) -> Tuple[int, int]:
+    while start < end and text[start].isspace():
+        start += 1
+    while end > start and text[end - 1].isspace():
+        end -= 1
+    return start, end
\ No newline at end of file
@@ -1,18 +1,52 @@
 from typing import Dict, List, Any
-from .base_agent import BaseAgent
+from .base_agent import BaseAgent, STAGE_VALIDATE
+from .readability import normalized_readability, readability_from_statistics, text_statistics
 
 class ValidatorAgent(BaseAgent):
     """Agent for final review and quality assurance"""
-    
+
+    description = "Performs final quality validation"
+    expected_latency_ms = 5.0
+    always_run = True
+    stage = STAGE_VALIDATE
+    shardable = True
+
     def __init__(self):
         super().__init__("Validator")
     
     def analyze(self, text: str, context: Dict[str, Any] = None) -> Dict[str, Any]:
         """Perform final validation and quality check"""
+        return self.merge_shards(text, [self.analyze_shard(text)], [0], context)
+    
+    def analyze_shard(self, text: str) -> Dict[str, Any]:
+        sentence_lengths = [len(s.split()) for s in text.split('.') if s.strip()]
         return {
-            "validation_results": self._validate_improvements(text, context),
-            "quality_score": self._calculate_quality_score(text),
-            "compliance_check": self._check_compliance(text),
+            "sentences": len(sentence_lengths),
+            "sentence_words": sum(sentence_lengths),
+            "long_sentences": sum(1 for length in sentence_lengths if length > 30),
+            "incomplete_sentences": sum(1 for length in sentence_lengths if length <= 3),
+            "terminal_punctuation": text.count('.') + text.count('!') + text.count('?'),
+            "non_empty": bool(text.strip()),
+            "statistics": text_statistics(text)
+        }
+    
+    def merge_shards(self, text: str, partials: List[Dict[str, Any]], offsets: List[int],
+                     context: Dict[str, Any] = None) -> Dict[str, Any]:
+        totals = {
+            key: sum(partial[key] for partial in partials)
+            for key in ("sentences", "sentence_words", "long_sentences",
+                        "incomplete_sentences", "terminal_punctuation")
+        }
+        totals["non_empty"] = any(partial["non_empty"] for partial in partials)
+        readability = readability_from_statistics({
+            key: sum(partial["statistics"][key] for partial in partials)
+            for key in ("words", "sentences", "syllables")
+        })
+        return {
+            "validation_results": self._validate_improvements(totals, context),
+            "quality_score": self._calculate_quality_score(totals, readability),
+            "readability": readability,
+            "compliance_check": self._check_compliance(totals),
             "agent": self.name
         }
     
@@ -24,12 +58,12 @@ class ValidatorAgent(BaseAgent):
             "final_review"
         ]
     
-    def _validate_improvements(self, text: str, context: Dict[str, Any] = None) -> List[Dict[str, str]]:
+    def _validate_improvements(self, totals: Dict[str, Any], context: Dict[str, Any] = None) -> List[Dict[str, str]]:
         """Validate that improvements maintain meaning and quality"""
         validations = []
         
         # Check basic text quality
-        if not text.strip():
+        if not totals["non_empty"]:
             validations.append({
                 "type": "validation",
                 "status": "error",
@@ -39,8 +73,7 @@ class ValidatorAgent(BaseAgent):
             return validations
         
         # Check sentence structure
-        sentences = [s.strip() for s in text.split('.') if s.strip()]
-        if not sentences:
+        if not totals["sentences"]:
             validations.append({
                 "type": "validation",
                 "status": "warning", 
@@ -49,12 +82,11 @@ class ValidatorAgent(BaseAgent):
             })
         
         # Validate against lenguaje claro principles
-        long_sentences = [s for s in sentences if len(s.split()) > 30]
-        if long_sentences:
+        if totals["long_sentences"]:
             validations.append({
                 "type": "validation",
                 "status": "warning",
-                "message": f"{len(long_sentences)} oraciones exceden 30 palabras",
+                "message": f"{totals['long_sentences']} oraciones exceden 30 palabras",
                 "recommendation": "Considerar división en oraciones más cortas",
                 "pdf_reference": "Principio de oraciones cortas"
             })
@@ -68,14 +100,13 @@ class ValidatorAgent(BaseAgent):
         
         return validations
     
-    def _calculate_quality_score(self, text: str) -> float:
+    def _calculate_quality_score(self, totals: Dict[str, Any], readability: Dict[str, Any]) -> float:
         """Calculate overall quality score"""
-        sentences = [s.strip() for s in text.split('.') if s.strip()]
-        if not sentences:
+        if not totals["sentences"]:
             return 0.0
         
         # Calculate average sentence length
-        avg_length = sum(len(s.split()) for s in sentences) / len(sentences)
+        avg_length = totals["sentence_words"] / totals["sentences"]
         
         # Score based on sentence length (optimal: 15-25 words)
         if 15 <= avg_length <= 25:
@@ -88,17 +119,18 @@ class ValidatorAgent(BaseAgent):
             length_score = 0.4
         
         # Basic completeness check
-        completeness_score = 1.0 if all(len(s.split()) > 3 for s in sentences) else 0.7
+        completeness_score = 1.0 if not totals["incomplete_sentences"] else 0.7
         
-        return (length_score + completeness_score) / 2
+        # Szigriszt-Pazos readability (syllables per word and words per sentence)
+        readability_score = normalized_readability(readability)
+        
+        return (length_score + completeness_score + readability_score) / 3
     
-    def _check_compliance(self, text: str) -> Dict[str, bool]:
+    def _check_compliance(self, totals: Dict[str, Any]) -> Dict[str, bool]:
         """Check compliance with lenguaje claro principles"""
-        sentences = [s.strip() for s in text.split('.') if s.strip()]
-        
         return {
-            "has_complete_sentences": len(sentences) > 0,
-            "appropriate_length": all(len(s.split()) <= 30 for s in sentences),
-            "proper_punctuation": text.count('.') > 0 or text.count('!') > 0 or text.count('?') > 0,
-            "non_empty": bool(text.strip())
+            "has_complete_sentences": totals["sentences"] > 0,
+            "appropriate_length": not totals["long_sentences"],
+            "proper_punctuation": totals["terminal_punctuation"] > 0,
+            "non_empty": totals["non_empty"]
         }
\ No newline at end of file
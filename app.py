@@ -1,105 +1,156 @@
 import streamlit as st
 from PIL import Image
-from groq import Groq
-import os
-
-# LangSmith tracing setup (simple)
-try:
-    from langsmith import traceable
-    # Set environment variables for LangSmith
-    os.environ["LANGCHAIN_TRACING_V2"] = "true"
-    os.environ["LANGCHAIN_PROJECT"] = "aclarador"
-    LANGSMITH_ENABLED = True
-except ImportError:
-    # Fallback decorator if LangSmith not available
-    def traceable(name=None):
-        def decorator(func):
-            return func
-        return decorator
-    LANGSMITH_ENABLED = False
-
-# Initialize the Groq client
-try:
-    client = Groq(api_key=os.environ.get("GROQ_API_KEY"))
-except:
-    client = None
-
-# Load system prompt
-def load_system_prompt():
-    """Load the comprehensive system prompt from markdown file"""
-    try:
-        with open('system_prompt.md', 'r', encoding='utf-8') as f:
-            content = f.read()
-            # Extract the prompt from the markdown code block
-            start_marker = "```\n"
-            end_marker = "\n```"
-            start_idx = content.find(start_marker)
-            if start_idx != -1:
-                start_idx += len(start_marker)
-                end_idx = content.find(end_marker, start_idx)
-                if end_idx != -1:
-                    return content[start_idx:end_idx].strip()
-        return None
-    except Exception as e:
-        print(f"Error loading system prompt: {e}")
-        return None
-
-# Function to process the input text (with conditional tracing)
-def process_text(input_text, enable_tracing=True):
-    """Process text using comprehensive system prompt with optional tracing"""
-
-    # Apply tracing decorator conditionally
-    if enable_tracing and LANGSMITH_ENABLED:
-        @traceable(name="process_text")
-        def _process_with_tracing(text):
-            return _process_text_core(text)
-        return _process_with_tracing(input_text)
-    else:
-        return _process_text_core(input_text)
+import hashlib
+import time
+from collections import OrderedDict
+from llm.prompts import build_messages, load_system_prompt, select_system_prompt
+from llm.singleflight import coalesced_completion
+from jobs.queue import JobQueue, STATUS_DONE, STATUS_FAILED
+from llm.structured import StructuredOutputError, parse_structured_rewrite, render_markdown
+from tracing import build_tracer
+from warmup import record_request_latency, shared_client, shared_coordinator
 
-def _process_text_core(input_text):
-    """Core text processing logic"""
-    if not client:
-        return "Error: GROQ_API_KEY no configurado"
+# Documents longer than this are processed by background workers in multi-agent mode
+LONG_DOCUMENT_WORDS = 1500
+
+# Processed results kept per session, least recently used evicted first
+MAX_SESSION_RESULTS = 10
 
-    # Load enhanced system prompt
-    system_prompt = load_system_prompt()
+MODE_SINGLE_PROMPT = "Prompt único"
+MODE_MULTI_AGENT = "Multiagente"
 
-    if not system_prompt:
-        # Fallback to basic prompt
-        system_prompt = '''
-        Eres un experto en lenguaje claro. Las pautas básicas para lenguaje claro son:
-        - Expresar una idea por oración.
-        - Utilizar oraciones de treinta palabras o menos.
-        - Evitar la jerga.
-        - Seguir el orden sujeto, verbo y predicado.
-        - Utilizar una estructura lógica, organizando la información de manera clara y coherente.
-        Evalúa la calidad del lenguaje de este texto y sugiere las correcciones oportunas.
-        Muestra siempre primero el texto corregido y a continuación las explicaciones, utilizando el siguiente lenguaje de marcado:
+# Long-lived resources shared by every session and rerun. Under serve.py they
+# were already built and exercised by the warm-up before the first session
+@st.cache_resource
+def get_client():
+    """LLM client (Groq, or a recording/replay backend), one per server process"""
+    return shared_client()
 
-        ###TEXTO CORREGIDO###
+@st.cache_resource
+def get_coordinator():
+    """Agent pipeline (registry, lexicon, knowledge base), one per server process"""
+    return shared_coordinator()
 
-        ###EXPLICACIÓN###
-        '''
+@st.cache_resource
+def get_job_queue():
+    """Queue of long documents for the background workers, one per server process"""
+    return JobQueue()
 
-    # Combine system prompt with user input
-    full_prompt = f"{system_prompt}\n\n{input_text}"
+@st.cache_resource
+def get_tracer():
+    """Sampling tracer with its background exporter, shared by all sessions"""
+    return build_tracer()
+
+client = get_client()
+job_queue = get_job_queue()
+tracer = get_tracer()
+
+def _process_text_core(input_text):
+    """Core text processing logic"""
+    if not client:
+        return "Error: GROQ_API_KEY no configurado"
+
+    # Stable system prefix (manual + response format) and variable user message,
+    # so provider-side prefix caching can reuse the manual across requests
+    system_prompt = select_system_prompt(input_text)
+    messages = build_messages(system_prompt, f"TEXTO A ANALIZAR:\n{input_text}")
 
     try:
-        chat_completion = client.chat.completions.create(
-            messages=[
-                {
-                    "role": "user",
-                    "content": full_prompt,
-                }
-            ],
+        response = coalesced_completion(
+            client,
+            messages=messages,
             model="llama-3.3-70b-versatile",
-            temperature=0.3
+            temperature=0.3,
+            response_format={"type": "json_object"}
         )
-        return chat_completion.choices[0].message.content
+        return render_markdown(parse_structured_rewrite(response, input_text))
+    except StructuredOutputError as e:
+        return f"Error: respuesta estructurada no válida ({e})"
     except Exception as e:
         return f"Error procesando con Groq: {e}"
 
+def input_key(text, mode):
+    """Session key of a result: the same text and mode are never processed twice"""
+    return hashlib.sha256(f"{mode}\n{text}".encode("utf-8")).hexdigest()
+
+def is_failed(result):
+    """Failed results are not kept, so retrying the same text calls the backend again"""
+    if result["mode"] == MODE_MULTI_AGENT:
+        return any("error" in agent_result for agent_result in result["results"]["agent_results"].values())
+    return result["markdown"].startswith("Error")
+
+def remember_result(key, result):
+    results = st.session_state["results"]
+    results[key] = result
+    results.move_to_end(key)
+    while len(results) > MAX_SESSION_RESULTS:
+        results.popitem(last=False)
+
+def run_processing(text, mode, force_trace):
+    """Process the text with the selected mode and return a result to keep in the session"""
+    start = time.perf_counter()
+    try:
+        return _run_processing(text, mode, force_trace)
+    finally:
+        record_request_latency((time.perf_counter() - start) * 1000)
+
+def _run_processing(text, mode, force_trace):
+    # Sampling is decided per request; force_trace only affects this session's requests
+    with tracer.trace("process_text", force=force_trace, mode=mode, words=len(text.split())) as trace:
+        if mode == MODE_MULTI_AGENT:
+            return {"mode": mode, "results": get_coordinator().process_text(text)}
+        output = _process_text_core(text)
+        if trace is not None and output.startswith("Error"):
+            trace.set_error(output)
+        return {"mode": mode, "markdown": output}
+
+@st.fragment
+def render_corrected_text(results, key):
+    st.markdown(get_coordinator().format_corrected_text(results))
+    st.download_button(
+        "⬇️ Descargar texto corregido",
+        results["corrected_text"],
+        file_name="texto_corregido.txt",
+        key=f"{key}_download"
+    )
+
+@st.fragment
+def render_analysis(results, key):
+    st.markdown(get_coordinator().format_analysis(results))
+
+@st.fragment
+def render_improvements(results, key):
+    improvements = results.get("improvements", [])
+    if not improvements:
+        return
+    agents = sorted({improvement["agent"] for improvement in improvements})
+    # Filtering reruns only this fragment, not the pipeline or the rest of the page
+    shown = st.multiselect("Filtrar mejoras por agente", agents, default=agents, key=f"{key}_agents")
+    st.markdown(get_coordinator().format_improvements(
+        [improvement for improvement in improvements if improvement["agent"] in shown]
+    ))
+
+@st.fragment
+def render_guidelines(results, key):
+    guidelines = results.get("knowledge_guidelines", [])
+    if guidelines:
+        st.markdown(get_coordinator().format_guidelines(guidelines))
+
+@st.fragment
+def render_quality(results, key):
+    quality = get_coordinator().format_quality(results)
+    if quality:
+        st.markdown(quality)
+
+def render_coordinator_results(results, key):
+    """Render each section of a coordinator result as an independent fragment"""
+    # The key prefix keeps widgets distinct when two results render in the same run
+    render_corrected_text(results, key)
+    render_analysis(results, key)
+    render_improvements(results, key)
+    render_guidelines(results, key)
+    render_quality(results, key)
+
 # Main app
 st.set_page_config(
     page_title="Aclarador - Lenguaje Claro",
@@ -113,27 +164,29 @@ st.write("*Herramienta para mejorar la claridad de textos en español*")
 # Sidebar for configuration
 st.sidebar.write("## ⚙️ Configuración")
 
-# LangSmith tracing toggle
-if LANGSMITH_ENABLED:
+# Tracing: sampled per request; errors and slow requests are always kept
+if tracer.enabled:
     tracing_enabled = st.sidebar.toggle(
-        "🔍 LangSmith Tracing",
-        value=True,
-        help="Activar/desactivar el seguimiento de LangSmith para análisis detallado"
+        "🔍 Trazar mis peticiones",
+        value=False,
+        help="Guarda la traza de todas las peticiones de esta sesión. "
+             "Sin activarlo se traza una muestra, los errores y las peticiones lentas."
+    )
+    st.sidebar.caption(
+        f"Muestreo: {tracer.policy.sample_rate:.0%} · lentas: > {tracer.policy.slow_ms / 1000:.0f} s"
     )
-
-    if tracing_enabled:
-        st.sidebar.success("✅ Tracing activo")
-        # Set environment variables when enabled
-        os.environ["LANGCHAIN_TRACING_V2"] = "true"
-        os.environ["LANGCHAIN_PROJECT"] = "aclarador"
-    else:
-        st.sidebar.info("⏸️ Tracing desactivado")
-        # Disable tracing when toggled off
-        os.environ["LANGCHAIN_TRACING_V2"] = "false"
 else:
-    st.sidebar.info("🔍 LangSmith: No disponible")
+    st.sidebar.info("🔍 Trazas: desactivadas")
     tracing_enabled = False
 
+# Processing mode
+mode = st.sidebar.radio(
+    "🧩 Modo de procesamiento",
+    [MODE_SINGLE_PROMPT, MODE_MULTI_AGENT],
+    help="Prompt único: una llamada al modelo con el manual completo. "
+         "Multiagente: análisis por agentes especializados."
+)
+
 # System prompt status
 system_prompt_loaded = load_system_prompt() is not None
 if system_prompt_loaded:
@@ -150,6 +203,9 @@ with col1:
     # Create a text input widget with session state
     if "user_input" not in st.session_state:
         st.session_state["user_input"] = ""
+    # Processed results, keyed by input hash, survive reruns and sidebar changes
+    if "results" not in st.session_state:
+        st.session_state["results"] = OrderedDict()
 
     user_input = st.text_area(
         'Pega tu texto aquí:',
@@ -168,15 +224,61 @@ with col2:
 
     if st.button("🗑️ Limpiar"):
         st.session_state["user_input"] = ""
+        st.session_state.pop("current_result", None)
         st.rerun()
 
 # Process text when button is clicked
 if process_button and user_input.strip():
-    with st.spinner('Procesando texto...'):
-        # Use the tracing state from the toggle
-        processed_output = process_text(user_input, enable_tracing=tracing_enabled)
-        st.write("## 📋 Resultado")
-        st.markdown(processed_output)
+    if mode == MODE_MULTI_AGENT and len(user_input.split()) > LONG_DOCUMENT_WORDS:
+        # Long documents go to the background queue so a reload does not lose them.
+        # Workers run the agent pipeline; single-prompt requests stay in the session
+        job_id = job_queue.enqueue(user_input)
+        st.query_params["job"] = job_id
+    else:
+        key = input_key(user_input, mode)
+        result = st.session_state["results"].get(key)
+        if result is None:
+            with st.spinner('Procesando texto...'):
+                # Trace every request of this session when the toggle is on
+                result = run_processing(user_input, mode, tracing_enabled)
+            if not is_failed(result):
+                remember_result(key, result)
+        else:
+            st.session_state["results"].move_to_end(key)
+        st.session_state["current_result"] = result
+
+# Last result of this session; reruns that do not change the input only re-render it
+current = st.session_state.get("current_result")
+if current is not None:
+    st.write("## 📋 Resultado")
+    if current["mode"] == MODE_MULTI_AGENT:
+        render_coordinator_results(current["results"], "current")
+    else:
+        st.markdown(current["markdown"])
+
+# Background job status, kept in the URL so it survives tab reloads
+if "job" in st.query_params:
+    job = job_queue.get(st.query_params["job"])
+    st.write("## 📋 Resultado")
+    if job is None:
+        st.warning("Trabajo no encontrado")
+    elif job["status"] == STATUS_DONE:
+        result = {"mode": MODE_MULTI_AGENT, "results": job["result"]["results"]}
+        if is_failed(result):
+            # Jobs completed before workers retried agent errors
+            errors = [r["error"] for r in result["results"]["agent_results"].values() if "error" in r]
+            st.error(f"El procesamiento falló: {'; '.join(errors)}")
+        else:
+            render_coordinator_results(result["results"], f"job_{job['id']}")
+            # From now on the result is this session's current one, not a pending job
+            st.session_state["current_result"] = result
+            del st.query_params["job"]
+    elif job["status"] == STATUS_FAILED:
+        st.error(f"El procesamiento falló tras {job['attempts']} intentos: {job['error']}")
+    else:
+        completed = ", ".join(job["progress"]) or "ninguna"
+        st.info(f"Documento en cola de procesamiento (trabajo {job['id']}). Etapas completadas: {completed}")
+        st.button("🔄 Actualizar estado")
 
 # Footer
 st.write("---")
@@ -199,8 +301,9 @@ with col_f2:
 with col_f3:
     st.write("**📊 Estado del sistema:**")
     st.write(f"• Manual de Estilo: {'✅ Cargado' if system_prompt_loaded else '⚠️ Básico'}")
-    if LANGSMITH_ENABLED:
-        st.write(f"• LangSmith: {'🔍 Activo' if tracing_enabled else '⏸️ Inactivo'}")
+    if tracer.enabled:
+        st.write(f"• Trazas: {'🔍 Todas (sesión)' if tracing_enabled else f'🎲 Muestreo {tracer.policy.sample_rate:.0%}'}")
     else:
-        st.write("• LangSmith: ❌ No disponible")
-    st.write(f"• Groq API: {'✅ Configurado' if client else '❌ No configurado'}")
\ No newline at end of file
+        st.write("• Trazas: ❌ Desactivadas")
+    st.write(f"• Groq API: {'✅ Configurado' if client else '❌ No configurado'}")
+    st.write(f"• Modo: {mode}")
\ No newline at end of file
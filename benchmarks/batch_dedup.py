@@ -0,0 +1,96 @@
+"""Count LLM calls for a batch of form letters and check derived rewrites keep their own data.
+
+The rewriter is answered by a scripted client, so the run needs no network.
+Exits with status 1 if a letter's rewrite carries another letter's amounts or
+dates.
+
+Usage: python benchmarks/batch_dedup.py [--letters N]
+"""
+import argparse
+import json
+import os
+import sys
+from types import SimpleNamespace
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from agent_coordinator import AgentCoordinator
+from dedup import apply_substitutions
+
+RECIPIENTS = [
+    ("Estimado", "Juan Pérez", "1", "1.200", "3 de marzo de 2024"),
+    ("Estimada", "María López", "2", "2.450", "15 de abril de 2024"),
+    ("Estimado", "Luis Gómez", "3", "310", "2 de mayo de 2024"),
+    ("Estimada", "Ana Ruiz", "4", "75", "9 de junio de 2024"),
+    ("Estimado", "Pedro Sanz", "5", "5.100", "11 de julio de 2024"),
+    ("Estimada", "Lucía Martín", "6", "12", "1 de agosto de 2024"),
+]
+
+# Cases where a differing span also occurs inside a longer number
+SUBSTITUTION_CASES = [
+    ("Debe pagar 1.200 euros antes del 1 de marzo.", [("1", "2")], None),
+    ("Debe pagar 1.200 euros antes del 1 de marzo.", [("1", "2"), ("1.200", "2.450")],
+     "Debe pagar 2.450 euros antes del 2 de marzo."),
+    ("Plazo hasta el 12/01/2024 para el expediente 1.", [("1", "3")], None),
+]
+
+def build_letter(salutation: str, name: str, number: str, amount: str, date: str) -> str:
+    return "\n\n".join([
+        f"{salutation} {name}:",
+        f"Por medio de la presente se le comunica que la liquidación número {number} de fecha {date} "
+        f"fue aprobada por la comisión, y que deberá proceder al abono de {amount} euros en el plazo "
+        f"de diez días hábiles.",
+        "Atentamente,",
+        "La comisión de valoración"
+    ])
+
+class ScriptedCompletions:
+    """Rewrites by fixed phrase replacements, keeping names, dates and amounts"""
+
+    def __init__(self):
+        self.calls = 0
+
+    def create(self, messages, **kwargs):
+        self.calls += 1
+        text = messages[-1]["content"].split("TEXTO A REESCRIBIR:\n", 1)[1]
+        rewritten = text.replace(
+            "Por medio de la presente se le comunica que", "Le informamos de que"
+        ).replace("deberá proceder al abono de", "debe pagar")
+        content = json.dumps({"rewritten_text": rewritten, "edits": []}, ensure_ascii=False)
+        return SimpleNamespace(choices=[SimpleNamespace(message=SimpleNamespace(content=content))])
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--letters", type=int, default=len(RECIPIENTS), help="Number of letters")
+    args = parser.parse_args()
+
+    failures = 0
+    for text, pairs, expected in SUBSTITUTION_CASES:
+        result = apply_substitutions(text, pairs)
+        if result != expected:
+            print(f"apply_substitutions({text!r}, {pairs}) = {result!r}, expected {expected!r}")
+            failures += 1
+
+    recipients = [RECIPIENTS[i % len(RECIPIENTS)] for i in range(args.letters)]
+    letters = [build_letter(*recipient) for recipient in recipients]
+    completions = ScriptedCompletions()
+    coordinator = AgentCoordinator(enable_result_cache=False)
+    coordinator.rewriter.client = SimpleNamespace(chat=SimpleNamespace(completions=completions))
+    batch = coordinator.process_batch(letters)
+
+    for recipient, result in zip(recipients, batch["results"]):
+        rewritten = result["agent_results"]["rewriter"]["rewritten_text"]
+        _, name, number, amount, date = recipient
+        if f"{name}:" not in rewritten or f"número {number} de fecha {date} " not in rewritten \
+                or f" {amount} euros" not in rewritten:
+            print(f"Letter to {name} lost its data: {rewritten!r}")
+            failures += 1
+
+    report = batch["report"]
+    print(f"{report['documents']} letters, {report['clusters']} clusters, {completions.calls} LLM calls "
+          f"(baseline {report['baseline_llm_calls']}, {report['fallbacks']} fallbacks)")
+    if failures:
+        sys.exit(1)
+
+if __name__ == "__main__":
+    main()
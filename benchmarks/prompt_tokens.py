@@ -0,0 +1,55 @@
+"""Compare input tokens per request before and after prompt prefix reuse.
+
+Usage: python benchmarks/prompt_tokens.py
+"""
+import os
+import sys
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from llm.prompts import (
+    build_messages,
+    estimate_tokens,
+    load_system_prompt,
+    prompt_token_report,
+    select_system_prompt
+)
+from llm.structured import STRUCTURED_RESPONSE_INSTRUCTIONS
+
+SAMPLE_TEXTS = [
+    "Le informamos de que su solicitud ha sido recibida.",
+    "Por medio de la presente se le comunica que, con el fin de proceder a la tramitación del "
+    "expediente, deberá aportar la documentación requerida en el plazo de diez días hábiles.",
+    ("La propuesta fue aprobada por el departamento en la sesión celebrada el pasado martes, "
+     "en la cual se procedió a la realización de la comprobación de los requisitos establecidos "
+     "en la convocatoria, siendo necesario que los interesados presenten la documentación "
+     "acreditativa antes de la finalización del plazo. ") * 6,
+]
+
+def baseline_tokens(text: str) -> int:
+    """Tokens sent by the previous layout: full manual concatenated into one user message"""
+    system_prompt = load_system_prompt() or ""
+    return estimate_tokens(f"{system_prompt}\n\n{STRUCTURED_RESPONSE_INSTRUCTIONS}\n\nTEXTO A ANALIZAR:\n{text}")
+
+def main():
+    print(f"{'words':>6} {'before':>8} {'after':>8} {'static':>8} {'dynamic':>8}")
+    total_before = total_after = total_uncached = 0
+    for text in SAMPLE_TEXTS:
+        messages = build_messages(select_system_prompt(text), f"TEXTO A ANALIZAR:\n{text}")
+        report = prompt_token_report(messages)
+        before = baseline_tokens(text)
+        total_before += before
+        total_after += report["total_tokens"]
+        total_uncached += report["dynamic_tokens"]
+        print(f"{len(text.split()):>6} {before:>8} {report['total_tokens']:>8} "
+              f"{report['static_tokens']:>8} {report['dynamic_tokens']:>8}")
+
+    print()
+    print(f"Input tokens per request: {total_before / len(SAMPLE_TEXTS):.0f} -> "
+          f"{total_after / len(SAMPLE_TEXTS):.0f} "
+          f"({1 - total_after / total_before:.1%} fewer)")
+    print(f"Uncached tokens per request with a warm prefix cache: "
+          f"{total_uncached / len(SAMPLE_TEXTS):.0f}")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,75 @@
+"""Time the heuristic agents on a long document, single-process and sharded.
+
+Usage: python benchmarks/sharding.py [--chars N] [--workers 1,2,4]
+"""
+import argparse
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from agents.registry import build_default_registry
+from agents.sharding import ShardedExecutor
+
+SAMPLE_PARAGRAPHS = [
+    "La propuesta fue aprobada por el departamento en la sesión celebrada el pasado martes, "
+    "en la cual se procedió a la realización de la comprobación de los requisitos establecidos "
+    "en la convocatoria, siendo necesario que los interesados presenten la documentación "
+    "acreditativa antes de la finalización del plazo.",
+    "Por medio de la presente se le comunica que, con el fin de proceder a la tramitación del "
+    "expediente, deberá aportar la documentación requerida en el plazo de diez días hábiles.",
+    "Artículo 12. Los sujetos obligados que no hubieran efectuado el abono de la cuota en tiempo "
+    "y forma serán requeridos para que subsanen la falta. Si es necesario, se iniciará el "
+    "procedimiento sancionador correspondiente.",
+    "El ciudadano puede consultar el estado de su solicitud en la sede electrónica. Mas de la "
+    "mitad de las solicitudes se resuelven en menos de un mes.",
+]
+
+AGENT_KEYS = ["grammar", "style", "seo", "validator"]
+
+def build_document(chars: int) -> str:
+    paragraphs = []
+    length = 0
+    i = 0
+    while length < chars:
+        paragraph = SAMPLE_PARAGRAPHS[i % len(SAMPLE_PARAGRAPHS)]
+        paragraphs.append(paragraph)
+        length += len(paragraph) + 2
+        i += 1
+    return "\n\n".join(paragraphs)
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--chars", type=int, default=2_000_000, help="Document size in characters")
+    parser.add_argument("--workers", default=",".join(
+        str(n) for n in sorted({1, 2, 4, os.cpu_count() or 1}) if n <= (os.cpu_count() or 1)
+    ), help="Comma-separated worker counts")
+    args = parser.parse_args()
+
+    registry = build_default_registry()
+    agents = {key: registry.get(key) for key in AGENT_KEYS}
+    text = build_document(args.chars)
+    print(f"{len(text):,} characters, {len(text.split()):,} words, {os.cpu_count()} cores")
+
+    start = time.perf_counter()
+    expected = {key: agent.analyze(text) for key, agent in agents.items()}
+    baseline = time.perf_counter() - start
+    print(f"{'single':>10} {baseline:8.2f}s")
+
+    for workers in (int(n) for n in args.workers.split(",")):
+        executor = ShardedExecutor(max_workers=workers, min_chars=0)
+        executor.analyze(agents, text[:executor.shard_chars * workers])  # start the pool
+        start = time.perf_counter()
+        results = executor.analyze(agents, text)
+        elapsed = time.perf_counter() - start
+        executor.shutdown()
+
+        identical = results == expected
+        print(f"{workers:>3} workers {elapsed:8.2f}s  speedup {baseline / elapsed:5.2f}x  "
+              f"{'identical' if identical else 'DIFFERENT'}")
+        if not identical:
+            sys.exit(1)
+
+if __name__ == "__main__":
+    main()
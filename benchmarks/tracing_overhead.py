@@ -0,0 +1,66 @@
+"""Measure the tracer's cost on the request path against OVERHEAD_BUDGET_US.
+
+Runs the heuristic pipeline (no LLM) untraced and traced at several sampling
+rates, exporting to a sink that discards traces.
+
+Usage: python benchmarks/tracing_overhead.py [--requests N]
+"""
+import argparse
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import metrics
+from agent_coordinator import AgentCoordinator
+from agents.registry import build_default_registry
+from tracing import OVERHEAD_BUDGET_US, BatchExporter, SamplingPolicy, Tracer
+
+SAMPLE_TEXTS = [
+    "Le informamos de que su solicitud ha sido recibida.",
+    "Por medio de la presente se le comunica que, con el fin de proceder a la tramitación del "
+    "expediente, deberá aportar la documentación requerida en el plazo de diez días hábiles.",
+    "La propuesta fue aprobada por el departamento en la sesión celebrada el pasado martes. "
+    "Si el es el titular, tu puedes autorizar el cambio.",
+]
+
+def run(coordinator: AgentCoordinator, tracer: Tracer, requests: int) -> float:
+    """Mean wall-clock milliseconds per request"""
+    start = time.perf_counter()
+    for i in range(requests):
+        text = SAMPLE_TEXTS[i % len(SAMPLE_TEXTS)]
+        with tracer.trace("process_text", words=len(text.split())):
+            coordinator.process_text(text)
+    return (time.perf_counter() - start) * 1000 / requests
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--requests", type=int, default=3000)
+    args = parser.parse_args()
+
+    registry = build_default_registry()
+    registry.unregister("rewriter")
+    coordinator = AgentCoordinator(registry=registry, enable_result_cache=False)
+    run(coordinator, Tracer(exporter=None), 100)  # warm caches
+
+    baseline = run(coordinator, Tracer(exporter=None), args.requests)
+    print(f"{'untraced':>14} {baseline * 1000:9.1f} µs/request")
+
+    over_budget = False
+    for rate in (0.0, 0.05, 1.0):
+        exporter = BatchExporter(lambda batch: None)
+        tracer = Tracer(SamplingPolicy(sample_rate=rate, seed=0), exporter)
+        metrics.reset()
+        elapsed = run(coordinator, tracer, args.requests)
+        exporter.close()
+        overhead = metrics.snapshot()["timings"]["tracing_overhead_us"]
+        over_budget = over_budget or overhead["mean"] > OVERHEAD_BUDGET_US
+        print(f"{f'sampled {rate:.0%}':>14} {elapsed * 1000:9.1f} µs/request  "
+              f"tracer {overhead['mean']:6.1f} µs mean, {overhead['max']:7.1f} µs max "
+              f"(budget {OVERHEAD_BUDGET_US:.0f} µs)")
+
+    sys.exit(1 if over_budget else 0)
+
+if __name__ == "__main__":
+    main()
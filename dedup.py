@@ -0,0 +1,203 @@
+"""Near-duplicate paragraph clustering so batches pay for one rewrite per template.
+
+Letters generated from the same template differ only in names, dates and
+amounts. Paragraphs are fingerprinted with SimHash over word shingles, with
+those variable spans masked, and clustered by Hamming distance. One
+representative per cluster is rewritten; the other members reuse the rewrite by
+re-substituting the spans where they differ from the representative.
+"""
+import hashlib
+import re
+from difflib import SequenceMatcher
+from typing import Dict, List, Any, Optional, Tuple
+
+SIMHASH_BITS = 64
+# Maximum Hamming distance between fingerprints of the same cluster
+MAX_DISTANCE = 6
+# Maximum number of distinct differing spans for a rewrite to be re-substituted
+MAX_CHANGED_SPANS = 6
+# Maximum length in tokens of one differing span (a long name, a full date)
+MAX_SPAN_TOKENS = 5
+
+_PARAGRAPH_SEPARATOR = re.compile(r"(\n\s*\n)")
+_TOKEN_PATTERN = re.compile(r"\d[\d.,]*\d|\w+|[^\w\s]", re.UNICODE)
+
+# Spans that vary between letters of the same template
+_VARIABLE_PATTERNS = [
+    re.compile(r"\b\d{1,2}\s+de\s+[a-záéíóú]+\s+de\s+\d{4}\b", re.IGNORECASE),  # 3 de marzo de 2024
+    re.compile(r"\b\d{1,2}[/-]\d{1,2}[/-]\d{2,4}\b"),  # 03/03/2024
+    re.compile(r"[\w.+-]+@[\w-]+\.[\w.]+"),  # e-mail
+    re.compile(r"\b\d{8}[A-Z]\b"),  # DNI
+    re.compile(r"\d[\d.,]*\s*(?:€|euros?\b)?", re.IGNORECASE),  # amounts and other numbers
+    re.compile(r"(?<=[a-záéíóúñ,;:] )[A-ZÁÉÍÓÚÑ][a-záéíóúñ]+(?: [A-ZÁÉÍÓÚÑ][a-záéíóúñ]+)*"),  # names
+    re.compile(r"\b(?:Estimad|Apreciad|Querid|Distinguid)[oa]s?\b"),  # salutation agreeing with the name
+]
+
+def split_paragraphs(text: str) -> List[str]:
+    """Split text into paragraphs and separators; joining the parts restores the text"""
+    return _PARAGRAPH_SEPARATOR.split(text)
+
+def mask_variables(paragraph: str) -> str:
+    """Replace names, dates, amounts and identifiers with a placeholder"""
+    for pattern in _VARIABLE_PATTERNS:
+        paragraph = pattern.sub(" _VAR_ ", paragraph)
+    return paragraph
+
+def simhash(text: str, shingle_size: int = 3) -> int:
+    """64-bit SimHash over word shingles of the masked text"""
+    words = _TOKEN_PATTERN.findall(mask_variables(text).lower())
+    shingles = [" ".join(words[i:i + shingle_size]) for i in range(max(len(words) - shingle_size + 1, 1))]
+    weights = [0] * SIMHASH_BITS
+    for shingle in shingles:
+        h = int.from_bytes(hashlib.blake2b(shingle.encode("utf-8"), digest_size=8).digest(), "big")
+        for bit in range(SIMHASH_BITS):
+            weights[bit] += 1 if h >> bit & 1 else -1
+    return sum(1 << bit for bit in range(SIMHASH_BITS) if weights[bit] > 0)
+
+def hamming_distance(a: int, b: int) -> int:
+    return bin(a ^ b).count("1")
+
+def cluster_paragraphs(paragraphs: List[str], max_distance: int = MAX_DISTANCE) -> List[List[int]]:
+    """Group near-duplicate paragraphs; the first index of each cluster is its representative"""
+    # Band the fingerprint so only paragraphs sharing a band are compared (LSH)
+    bands = max_distance + 1
+    band_bits = SIMHASH_BITS // bands
+    buckets: Dict[Tuple[int, int], List[int]] = {}
+    fingerprints = [simhash(p) for p in paragraphs]
+    cluster_of: Dict[int, int] = {}
+    clusters: List[List[int]] = []
+
+    for i, fingerprint in enumerate(fingerprints):
+        band_keys = [(b, fingerprint >> (b * band_bits) & ((1 << band_bits) - 1)) for b in range(bands)]
+        match = None
+        for band_key in band_keys:
+            for candidate in buckets.get(band_key, []):
+                representative = clusters[cluster_of[candidate]][0]
+                if hamming_distance(fingerprint, fingerprints[representative]) <= max_distance:
+                    match = cluster_of[candidate]
+                    break
+            if match is not None:
+                break
+
+        if match is None:
+            match = len(clusters)
+            clusters.append([])
+        clusters[match].append(i)
+        cluster_of[i] = match
+        for band_key in band_keys:
+            buckets.setdefault(band_key, []).append(i)
+
+    return clusters
+
+def substitution_pairs(representative: str, variant: str,
+                       max_spans: int = MAX_CHANGED_SPANS) -> Optional[List[Tuple[str, str]]]:
+    """Spans to swap to turn the representative into the variant, or None if not a pure substitution"""
+    rep_tokens = list(_TOKEN_PATTERN.finditer(representative))
+    var_tokens = list(_TOKEN_PATTERN.finditer(variant))
+    matcher = SequenceMatcher(
+        None, [t.group() for t in rep_tokens], [t.group() for t in var_tokens], autojunk=False
+    )
+
+    pairs: Dict[str, str] = {}
+    for tag, i1, i2, j1, j2 in matcher.get_opcodes():
+        if tag == "equal":
+            continue
+        if tag != "replace":
+            return None  # insertions and deletions change the structure
+        if max(i2 - i1, j2 - j1) > MAX_SPAN_TOKENS:
+            return None  # more than a name, date or amount differs
+        source = representative[rep_tokens[i1].start():rep_tokens[i2 - 1].end()]
+        target = variant[var_tokens[j1].start():var_tokens[j2 - 1].end()]
+        if pairs.get(source, target) != target:
+            return None  # the same span maps to different values
+        pairs[source] = target
+
+    # Spans are counted rather than tokens, so short salutations with a full name still qualify
+    if len(pairs) > max_spans:
+        return None
+    return list(pairs.items())
+
+def _token_runs(text: str, source: str) -> List[Tuple[int, int]]:
+    """Offsets where the source appears as a run of whole tokens"""
+    source_tokens = _TOKEN_PATTERN.findall(source)
+    tokens = list(_TOKEN_PATTERN.finditer(text))
+    size = len(source_tokens)
+    runs = []
+    for i in range(len(tokens) - size + 1):
+        if all(tokens[i + k].group() == source_tokens[k] for k in range(size)):
+            start, end = tokens[i].start(), tokens[i + size - 1].end()
+            if text[start:end] == source:
+                runs.append((start, end))
+    return runs
+
+def _occurrences(text: str, source: str) -> List[int]:
+    starts = []
+    start = text.find(source)
+    while start != -1:
+        starts.append(start)
+        start = text.find(source, start + 1)
+    return starts
+
+def apply_substitutions(text: str, pairs: List[Tuple[str, str]],
+                        original: Optional[str] = None, strict: bool = True) -> Optional[str]:
+    """Swap every source span in one pass; None when a span is missing (if strict) or ambiguous"""
+    runs = {source: _token_runs(text, source) for source, _ in pairs}
+    edits = []
+    for source, target in pairs:
+        matched = {start for start, _ in runs[source]}
+        for start in _occurrences(text, source):
+            if start in matched:
+                continue
+            # "1" inside "1.200" must be neither swapped nor silently kept, unless that
+            # longer token is swapped as a whole
+            end = start + len(source)
+            if not any(s <= start and end <= e
+                       for other, spans in runs.items() if other != source for s, e in spans):
+                return None
+        if not runs[source]:
+            if strict:
+                return None
+            continue
+        # A span appearing more often than in the original is probably a coincidence
+        if original is not None and len(runs[source]) > len(_token_runs(original, source)):
+            return None
+        edits.extend((start, end, target) for start, end in runs[source])
+
+    edits.sort()
+    for (_, end, _), (next_start, _, _) in zip(edits, edits[1:]):
+        if next_start < end:
+            return None  # overlapping spans
+
+    output = []
+    cursor = 0
+    for start, end, target in edits:
+        output.append(text[cursor:start])
+        output.append(target)
+        cursor = end
+    output.append(text[cursor:])
+    return "".join(output)
+
+def map_rewrite(representative: str, variant: str, rewrite: str) -> Optional[Tuple[str, List[Tuple[str, str]]]]:
+    """Derive the variant's rewrite from the representative's, or None when unsafe"""
+    if variant == representative:
+        return rewrite, []
+    pairs = substitution_pairs(representative, variant)
+    if pairs is None:
+        return None
+    mapped = apply_substitutions(rewrite, pairs, original=representative)
+    if mapped is None:
+        return None
+    return mapped, pairs
+
+def batch_report(documents: int, paragraphs: int, llm_calls: int, clusters: int, fallbacks: int) -> Dict[str, Any]:
+    """Summary of LLM calls saved by deduplication, against one rewrite call per document"""
+    return {
+        "documents": documents,
+        "paragraphs": paragraphs,
+        "clusters": clusters,
+        "llm_calls": llm_calls,
+        "baseline_llm_calls": documents,
+        "fallbacks": fallbacks,
+        "llm_calls_saved": documents - llm_calls,
+        "llm_call_reduction": 1 - llm_calls / documents if documents else 0.0
+    }
\ No newline at end of file
@@ -0,0 +1 @@
+# Offline evaluation of pipeline configurations
\ No newline at end of file
@@ -0,0 +1,142 @@
+"""Compare pipeline configurations on a fixed corpus with reference rewrites.
+
+LLM calls are answered from recorded responses, so runs are deterministic and
+need no network. Record the responses once with a real GROQ_API_KEY:
+
+    python -m evaluation.run --record
+    python -m evaluation.run
+"""
+import argparse
+import json
+import os
+import tempfile
+import time
+from typing import Dict, List, Any, Optional
+
+import metrics
+from agent_coordinator import AgentCoordinator
+from agents.registry import build_default_registry
+from llm.backend import BACKEND_RECORD, create_client
+from llm.replay import ReplayClient
+from result_cache import ResultCache
+from .scoring import compliance_rate, reference_distance, summarize
+
+EVALUATION_DIR = os.path.dirname(os.path.abspath(__file__))
+CORPUS_PATH = os.path.join(EVALUATION_DIR, "corpus.jsonl")
+RECORDING_PATH = os.path.join(EVALUATION_DIR, "recordings.jsonl.gz")
+
+# Pipeline variants whose quality/latency trade-off we want to know
+CONFIGURATIONS = {
+    "completo": {
+        "description": "Reescritura con llama-3.3-70b y agentes heurísticos"
+    },
+    "modelo_pequeño": {
+        "description": "Reescritura con llama-3.1-8b-instant",
+        "model": "llama-3.1-8b-instant"
+    },
+    "heuristico": {
+        "description": "Solo agentes heurísticos, sin LLM",
+        "without_llm": True
+    },
+    "cache": {
+        "description": "Completo, segunda pasada servida por la caché de resultados",
+        "result_cache": True
+    }
+}
+
+def load_corpus(path: str = CORPUS_PATH) -> List[Dict[str, str]]:
+    with open(path, "r", encoding="utf-8") as f:
+        return [json.loads(line) for line in f if line.strip()]
+
+def build_coordinator(config: Dict[str, Any], client) -> AgentCoordinator:
+    """Coordinator for one configuration, with the rewriter bound to the given client"""
+    registry = build_default_registry()
+    if config.get("without_llm"):
+        registry.unregister("rewriter")
+    else:
+        rewriter = registry.get("rewriter")
+        rewriter.client = client
+        if config.get("model"):
+            rewriter.model = config["model"]
+
+    result_cache = None
+    if config.get("result_cache"):
+        result_cache = ResultCache(tempfile.mkdtemp(prefix="aclarador_eval_"))
+    return AgentCoordinator(
+        registry=registry,
+        result_cache=result_cache,
+        enable_result_cache=result_cache is not None
+    )
+
+def evaluate(name: str, config: Dict[str, Any], corpus: List[Dict[str, str]], client) -> List[Dict[str, Any]]:
+    """Process the corpus with one configuration and score every document"""
+    coordinator = build_coordinator(config, client)
+    if config.get("result_cache"):
+        # Warm the cache; the measured pass below is served from it
+        for document in corpus:
+            coordinator.process_text(document["text"])
+
+    rows = []
+    for document in corpus:
+        calls_before = metrics.snapshot()["counters"].get("llm_calls", 0)
+        start = time.perf_counter()
+        results = coordinator.process_text(document["text"])
+        latency_ms = (time.perf_counter() - start) * 1000
+        calls = metrics.snapshot()["counters"].get("llm_calls", 0) - calls_before
+
+        validation = results.get("final_validation", {})
+        errors = [r["error"] for r in results["agent_results"].values() if "error" in r]
+        rows.append({
+            "configuration": name,
+            "id": document["id"],
+            "quality": validation.get("quality_score", 0.0),
+            "compliance": compliance_rate(validation.get("compliance_check", {})),
+            "reference_distance": reference_distance(results["corrected_text"], document["reference"]),
+            "llm_calls": calls,
+            "latency_ms": latency_ms,
+            "error": errors[0] if errors else None
+        })
+    return rows
+
+def format_table(summaries: Dict[str, Dict[str, Any]]) -> str:
+    header = f"{'configuración':<16} {'calidad':>8} {'cumpl.':>7} {'dist.ref':>8} {'LLM':>5} {'errores':>8} {'ms media':>9} {'ms p95':>8}"
+    lines = [header, "-" * len(header)]
+    for name, summary in summaries.items():
+        lines.append(
+            f"{name:<16} {summary['quality']:>8.3f} {summary['compliance']:>7.1%} "
+            f"{summary['reference_distance']:>8.3f} {summary['llm_calls']:>5} {summary['errors']:>8} "
+            f"{summary['latency_ms_mean']:>9.1f} {summary['latency_ms_p95']:>8.1f}"
+        )
+    return "\n".join(lines)
+
+def main(argv: Optional[List[str]] = None):
+    parser = argparse.ArgumentParser(description="Evaluate Aclarador pipeline configurations offline")
+    parser.add_argument("--corpus", default=CORPUS_PATH)
+    parser.add_argument("--recording", default=RECORDING_PATH, help="Recorded LLM responses (JSON lines)")
+    parser.add_argument("--record", action="store_true", help="Call Groq and record missing responses")
+    parser.add_argument("--configs", default=",".join(CONFIGURATIONS), help="Comma-separated configurations")
+    parser.add_argument("--json", help="Write per-document scores and summaries to this file")
+    args = parser.parse_args(argv)
+
+    if args.record:
+        client = create_client(BACKEND_RECORD, args.recording)
+    else:
+        client = ReplayClient(args.recording)
+
+    corpus = load_corpus(args.corpus)
+    rows, summaries = [], {}
+    for name in args.configs.split(","):
+        config_rows = evaluate(name, CONFIGURATIONS[name], corpus, client)
+        rows.extend(config_rows)
+        summaries[name] = summarize(config_rows)
+
+    print(format_table(summaries))
+    if isinstance(client, ReplayClient) and client.misses:
+        print(f"\n{len(client.misses)} peticiones sin respuesta grabada; ejecute con --record")
+
+    if args.json:
+        with open(args.json, "w", encoding="utf-8") as f:
+            json.dump({"summaries": summaries, "documents": rows}, f, ensure_ascii=False, indent=2)
+
+if __name__ == "__main__":
+    main()
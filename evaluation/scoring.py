@@ -0,0 +1,53 @@
+from typing import Dict, List, Any
+from agents.tokenizer import words
+
+def edit_distance(a: List[str], b: List[str]) -> int:
+    """Levenshtein distance between two token sequences"""
+    previous = list(range(len(b) + 1))
+    for i, token_a in enumerate(a, 1):
+        current = [i]
+        for j, token_b in enumerate(b, 1):
+            current.append(min(
+                previous[j] + 1,
+                current[j - 1] + 1,
+                previous[j - 1] + (token_a != token_b)
+            ))
+        previous = current
+    return previous[-1]
+
+def reference_distance(text: str, reference: str) -> float:
+    """Word-level edit distance to the reference rewrite, normalized to 0-1"""
+    text_words, reference_words = words(text), words(reference)
+    longest = max(len(text_words), len(reference_words))
+    if not longest:
+        return 0.0
+    return edit_distance(text_words, reference_words) / longest
+
+def compliance_rate(compliance: Dict[str, bool]) -> float:
+    """Share of the validator's lenguaje claro checks that pass"""
+    if not compliance:
+        return 0.0
+    return sum(1 for passed in compliance.values() if passed) / len(compliance)
+
+def percentile(values: List[float], fraction: float) -> float:
+    """Nearest-rank percentile"""
+    if not values:
+        return 0.0
+    ordered = sorted(values)
+    index = min(int(fraction * len(ordered) + 0.5), len(ordered)) - 1
+    return ordered[max(index, 0)]
+
+def summarize(rows: List[Dict[str, Any]]) -> Dict[str, Any]:
+    """Aggregate per-document scores of one configuration"""
+    count = len(rows) or 1
+    latencies = [row["latency_ms"] for row in rows]
+    return {
+        "documents": len(rows),
+        "quality": sum(row["quality"] for row in rows) / count,
+        "compliance": sum(row["compliance"] for row in rows) / count,
+        "reference_distance": sum(row["reference_distance"] for row in rows) / count,
+        "llm_calls": sum(row["llm_calls"] for row in rows),
+        "errors": sum(1 for row in rows if row["error"]),
+        "latency_ms_mean": sum(latencies) / count,
+        "latency_ms_p95": percentile(latencies, 0.95)
+    }
@@ -0,0 +1 @@
+# Durable background job queue for long documents
\ No newline at end of file
@@ -0,0 +1,180 @@
+import json
+import os
+import sqlite3
+import time
+import uuid
+from contextlib import contextmanager
+from typing import Dict, List, Any, Iterator, Optional
+
+# Environment variable overriding the queue database location
+JOBS_DB_ENV = "ACLARADOR_JOBS_DB"
+DEFAULT_JOBS_DB = "aclarador_jobs.sqlite3"
+
+STATUS_QUEUED = "queued"
+STATUS_RUNNING = "running"
+STATUS_DONE = "done"
+STATUS_FAILED = "failed"
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS jobs (
+    id TEXT PRIMARY KEY,
+    status TEXT NOT NULL,
+    payload TEXT NOT NULL,
+    result TEXT,
+    error TEXT,
+    progress TEXT NOT NULL DEFAULT '[]',
+    attempts INTEGER NOT NULL DEFAULT 0,
+    max_attempts INTEGER NOT NULL,
+    worker TEXT,
+    lease_until REAL,
+    created_at REAL NOT NULL,
+    updated_at REAL NOT NULL
+);
+CREATE INDEX IF NOT EXISTS jobs_status_created ON jobs (status, created_at);
+"""
+
+class JobQueue:
+    """SQLite-backed durable queue of AgentCoordinator.process_text jobs"""
+
+    def __init__(self, db_path: Optional[str] = None, max_attempts: int = 3):
+        self.db_path = db_path or os.environ.get(JOBS_DB_ENV, DEFAULT_JOBS_DB)
+        self.max_attempts = max_attempts
+        with self._connect() as conn:
+            conn.executescript(_SCHEMA)
+
+    @contextmanager
+    def _connect(self) -> Iterator[sqlite3.Connection]:
+        conn = sqlite3.connect(self.db_path, timeout=30, isolation_level=None)
+        conn.row_factory = sqlite3.Row
+        try:
+            conn.execute("PRAGMA journal_mode=WAL")
+            yield conn
+        finally:
+            conn.close()
+
+    def enqueue(self, text: str, selected_agents: List[str] = None,
+                max_attempts: Optional[int] = None) -> str:
+        """Add a job and return its ID"""
+        job_id = uuid.uuid4().hex
+        now = time.time()
+        payload = json.dumps({"text": text, "selected_agents": selected_agents}, ensure_ascii=False)
+        with self._connect() as conn:
+            conn.execute(
+                "INSERT INTO jobs (id, status, payload, max_attempts, created_at, updated_at) "
+                "VALUES (?, ?, ?, ?, ?, ?)",
+                (job_id, STATUS_QUEUED, payload, max_attempts or self.max_attempts, now, now)
+            )
+        return job_id
+
+    def claim(self, worker_id: str, lease_seconds: float = 300.0) -> Optional[Dict[str, Any]]:
+        """Atomically take the oldest runnable job, including ones whose worker died"""
+        now = time.time()
+        with self._connect() as conn:
+            conn.execute("BEGIN IMMEDIATE")
+            try:
+                # Jobs abandoned by a dead worker that have used all their attempts
+                conn.execute(
+                    "UPDATE jobs SET status = ?, error = ?, updated_at = ? "
+                    "WHERE status = ? AND lease_until < ? AND attempts >= max_attempts",
+                    (STATUS_FAILED, "Worker perdido y reintentos agotados", now, STATUS_RUNNING, now)
+                )
+                row = conn.execute(
+                    "SELECT * FROM jobs WHERE status = ? OR (status = ? AND lease_until < ?) "
+                    "ORDER BY created_at LIMIT 1",
+                    (STATUS_QUEUED, STATUS_RUNNING, now)
+                ).fetchone()
+                if row is None:
+                    conn.execute("COMMIT")
+                    return None
+                conn.execute(
+                    "UPDATE jobs SET status = ?, worker = ?, lease_until = ?, attempts = attempts + 1, "
+                    "progress = '[]', updated_at = ? WHERE id = ?",
+                    (STATUS_RUNNING, worker_id, now + lease_seconds, now, row["id"])
+                )
+                conn.execute("COMMIT")
+            except Exception:
+                conn.execute("ROLLBACK")
+                raise
+
+        job = self._row_to_job(row)
+        job["attempts"] += 1
+        job["status"] = STATUS_RUNNING
+        return job
+
+    def record_progress(self, job_id: str, worker_id: str, stage: str,
+                        lease_seconds: float = 300.0):
+        """Append a completed stage and extend the worker's lease"""
+        now = time.time()
+        with self._connect() as conn:
+            conn.execute("BEGIN IMMEDIATE")
+            row = conn.execute(
+                "SELECT progress FROM jobs WHERE id = ? AND worker = ? AND status = ?",
+                (job_id, worker_id, STATUS_RUNNING)
+            ).fetchone()
+            if row is not None:
+                progress = json.loads(row["progress"])
+                progress.append(stage)
+                conn.execute(
+                    "UPDATE jobs SET progress = ?, lease_until = ?, updated_at = ? WHERE id = ?",
+                    (json.dumps(progress), now + lease_seconds, now, job_id)
+                )
+            conn.execute("COMMIT")
+
+    def complete(self, job_id: str, worker_id: str, result: Dict[str, Any]):
+        """Store the result of a finished job"""
+        with self._connect() as conn:
+            conn.execute(
+                "UPDATE jobs SET status = ?, result = ?, error = NULL, lease_until = NULL, updated_at = ? "
+                "WHERE id = ? AND worker = ?",
+                (STATUS_DONE, json.dumps(result, ensure_ascii=False, default=str), time.time(), job_id, worker_id)
+            )
+
+    def fail(self, job_id: str, worker_id: str, error: str):
+        """Record a failed attempt, requeueing the job while attempts remain"""
+        with self._connect() as conn:
+            conn.execute(
+                "UPDATE jobs SET status = CASE WHEN attempts < max_attempts THEN ? ELSE ? END, "
+                "error = ?, lease_until = NULL, updated_at = ? WHERE id = ? AND worker = ?",
+                (STATUS_QUEUED, STATUS_FAILED, error, time.time(), job_id, worker_id)
+            )
+
+    def get(self, job_id: str) -> Optional[Dict[str, Any]]:
+        """Return status, progress and (when done) result of a job"""
+        with self._connect() as conn:
+            row = conn.execute("SELECT * FROM jobs WHERE id = ?", (job_id,)).fetchone()
+        return self._row_to_job(row) if row is not None else None
+
+    def watch(self, job_id: str, poll_interval: float = 1.0,
+              timeout: Optional[float] = None) -> Iterator[Dict[str, Any]]:
+        """Yield the job each time its status or progress changes, until it finishes"""
+        deadline = time.time() + timeout if timeout is not None else None
+        last_seen = None
+        while True:
+            job = self.get(job_id)
+            if job is None:
+                return
+            fingerprint = (job["status"], len(job["progress"]), job["attempts"])
+            if fingerprint != last_seen:
+                last_seen = fingerprint
+                yield job
+            if job["status"] in (STATUS_DONE, STATUS_FAILED):
+                return
+            if deadline is not None and time.time() >= deadline:
+                return
+            time.sleep(poll_interval)
+
+    def _row_to_job(self, row: sqlite3.Row) -> Dict[str, Any]:
+        payload = json.loads(row["payload"])
+        return {
+            "id": row["id"],
+            "status": row["status"],
+            "text": payload["text"],
+            "selected_agents": payload["selected_agents"],
+            "progress": json.loads(row["progress"]),
+            "attempts": row["attempts"],
+            "max_attempts": row["max_attempts"],
+            "result": json.loads(row["result"]) if row["result"] else None,
+            "error": row["error"],
+            "created_at": row["created_at"],
+            "updated_at": row["updated_at"]
+        }
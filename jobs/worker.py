@@ -0,0 +1,150 @@
+"""Background workers draining the job queue.
+
+serve.py runs workers as threads of the web process, next to the queue file.
+A separate worker process only sees the web's jobs when both use the same
+database, so it must be given a path on shared storage:
+
+Usage: python -m jobs.worker --workers 2 --db /mnt/shared/aclarador_jobs.sqlite3
+
+Set ACLARADOR_SHARD_WORKERS to analyze very long documents across that many
+processes (ACLARADOR_SHARD_MIN_CHARS sets the size threshold, 200,000
+characters by default).
+"""
+import argparse
+import os
+import signal
+import socket
+import sys
+import threading
+import time
+import multiprocessing
+from typing import List, Optional
+
+from .queue import JOBS_DB_ENV, JobQueue
+
+def run_worker(db_path: Optional[str] = None, worker_id: Optional[str] = None,
+               poll_interval: float = 1.0, lease_seconds: float = 300.0,
+               use_knowledge_base: bool = False, stop_event=None, coordinator=None):
+    """Claim and process jobs until stop_event is set"""
+    from agent_coordinator import AgentCoordinator
+    from agents.sharding import executor_from_env
+    from tracing import build_tracer
+    from warmup import warm_up
+
+    worker_id = worker_id or f"{socket.gethostname()}-{os.getpid()}"
+    queue = JobQueue(db_path)
+    tracer = build_tracer()
+    if coordinator is None:
+        coordinator = AgentCoordinator(use_knowledge_base=use_knowledge_base, sharded_executor=executor_from_env())
+        # Pay the cold-start costs before claiming the first job
+        warm_up(coordinator=coordinator)
+
+    while stop_event is None or not stop_event.is_set():
+        job = queue.claim(worker_id, lease_seconds=lease_seconds)
+        if job is None:
+            time.sleep(poll_interval)
+            continue
+
+        def report(stage, job_id=job["id"]):
+            queue.record_progress(job_id, worker_id, stage, lease_seconds=lease_seconds)
+
+        try:
+            with tracer.trace("job", job_id=job["id"], attempt=job["attempts"]):
+                results = coordinator.process_text(
+                    job["text"],
+                    selected_agents=job["selected_agents"],
+                    progress_callback=report
+                )
+            # Agents report LLM and backend failures in their result instead of raising
+            errors = [
+                f"{agent_name}: {agent_result['error']}"
+                for agent_name, agent_result in results["agent_results"].items() if "error" in agent_result
+            ]
+            if errors:
+                print(f"Job {job['id']} failed (attempt {job['attempts']}/{job['max_attempts']}): {'; '.join(errors)}")
+                queue.fail(job["id"], worker_id, "; ".join(errors))
+                continue
+            queue.complete(job["id"], worker_id, {
+                "results": results,
+                "display": coordinator.format_results_for_display(results)
+            })
+        except Exception as e:
+            print(f"Job {job['id']} failed (attempt {job['attempts']}/{job['max_attempts']}): {e}")
+            queue.fail(job["id"], worker_id, f"{type(e).__name__}: {e}")
+
+def start_worker_threads(count: int, db_path: Optional[str] = None, coordinator=None,
+                         stop_event: Optional[threading.Event] = None) -> List[threading.Thread]:
+    """Run workers as daemon threads of this process, e.g. the web process sharing its queue file"""
+    threads = []
+    for index in range(count):
+        worker_id = f"{socket.gethostname()}-{os.getpid()}-thread{index}"
+        thread = threading.Thread(
+            target=run_worker,
+            args=(db_path, worker_id),
+            kwargs={"stop_event": stop_event, "coordinator": coordinator},
+            name=f"job-worker-{index}",
+            daemon=True
+        )
+        thread.start()
+        threads.append(thread)
+    return threads
+
+def _worker_process(db_path, index, poll_interval, use_knowledge_base, stop_event):
+    signal.signal(signal.SIGINT, signal.SIG_IGN)
+    worker_id = f"{socket.gethostname()}-{os.getpid()}-{index}"
+    run_worker(db_path, worker_id, poll_interval,
+               use_knowledge_base=use_knowledge_base, stop_event=stop_event)
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Run background workers for the Aclarador job queue")
+    parser.add_argument("--workers", type=int, default=int(os.environ.get("ACLARADOR_WORKERS", 2)))
+    parser.add_argument("--db", default=None, help="Path to the SQLite queue database")
+    parser.add_argument("--poll-interval", type=float, default=1.0)
+    parser.add_argument("--knowledge-base", action="store_true")
+    args = parser.parse_args(argv)
+
+    db_path = args.db or os.environ.get(JOBS_DB_ENV)
+    if not db_path:
+        # The default relative file is private to this process's filesystem: jobs
+        # enqueued by a web process elsewhere would never be claimed
+        sys.exit(f"No shared queue database: pass --db or set {JOBS_DB_ENV} to a path "
+                 "the web process also uses, or let serve.py run the workers in-process")
+    args.db = db_path
+
+    # Create the schema once before the workers race for it
+    JobQueue(args.db)
+
+    stop_event = multiprocessing.Event()
+    signal.signal(signal.SIGTERM, lambda signum, frame: stop_event.set())
+
+    def spawn(index):
+        process = multiprocessing.Process(
+            target=_worker_process,
+            args=(args.db, index, args.poll_interval, args.knowledge_base, stop_event),
+            # Not daemonic: daemonic processes cannot start the sharding pool
+            daemon=False
+        )
+        process.start()
+        return process
+
+    processes = [spawn(i) for i in range(args.workers)]
+    try:
+        # Restart workers that die; their leased jobs are retried after the lease expires
+        while not stop_event.is_set():
+            for i, process in enumerate(processes):
+                if not process.is_alive():
+                    print(f"Worker {i} exited with code {process.exitcode}, restarting")
+                    processes[i] = spawn(i)
+            # Sleep rather than wait on the event: the SIGTERM handler sets it, and would
+            # deadlock on the event's lock if the signal arrived inside wait()
+            time.sleep(1.0)
+    except KeyboardInterrupt:
+        stop_event.set()
+
+    for process in processes:
+        process.join(timeout=30)
+        if process.is_alive():
+            process.terminate()
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1 @@
+# LLM helpers shared by the app and the agents
\ No newline at end of file
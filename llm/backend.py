@@ -0,0 +1,38 @@
+import os
+from typing import Optional
+
+# Environment variables selecting the LLM backend and its recording file
+LLM_BACKEND_ENV = "ACLARADOR_LLM_BACKEND"
+LLM_RECORDING_ENV = "ACLARADOR_LLM_RECORDING"
+
+# groq: the Groq API (GROQ_BASE_URL can point it at llm.replay_server)
+# record: the Groq API, logging every call to the recording file
+# replay: answers from the recording file, in-process
+BACKEND_GROQ = "groq"
+BACKEND_RECORD = "record"
+BACKEND_REPLAY = "replay"
+
+DEFAULT_RECORDING_PATH = "llm_recording.jsonl.gz"
+
+def create_client(backend: Optional[str] = None, recording_path: Optional[str] = None):
+    """LLM client for the configured backend, or None when it cannot be created"""
+    backend = backend or os.environ.get(LLM_BACKEND_ENV, BACKEND_GROQ)
+    recording_path = recording_path or os.environ.get(LLM_RECORDING_ENV, DEFAULT_RECORDING_PATH)
+
+    if backend == BACKEND_REPLAY:
+        from .replay import ReplayClient
+        return ReplayClient(recording_path)
+    if backend not in (BACKEND_GROQ, BACKEND_RECORD):
+        print(f"Unknown LLM backend '{backend}', using {BACKEND_GROQ}")
+
+    try:
+        from groq import Groq
+        client = Groq(api_key=os.environ.get("GROQ_API_KEY"))
+    except Exception as e:
+        print(f"Could not create Groq client: {e}")
+        return None
+
+    if backend == BACKEND_RECORD:
+        from .replay import RecordingClient
+        return RecordingClient(client, recording_path)
+    return client
@@ -0,0 +1,96 @@
+import os
+import re
+from functools import lru_cache
+from typing import Dict, List, Any, Optional
+from .structured import STRUCTURED_RESPONSE_INSTRUCTIONS
+
+SYSTEM_PROMPT_PATH = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "system_prompt.md")
+
+# Inputs up to this many words use the compact manual
+SHORT_INPUT_WORDS = 80
+
+BASIC_SYSTEM_PROMPT = """Eres un experto en lenguaje claro. Las pautas básicas para lenguaje claro son:
+- Expresar una idea por oración.
+- Utilizar oraciones de treinta palabras o menos.
+- Evitar la jerga.
+- Seguir el orden sujeto, verbo y predicado.
+- Utilizar una estructura lógica, organizando la información de manera clara y coherente.
+Evalúa la calidad del lenguaje de este texto y sugiere las correcciones oportunas."""
+
+_TOKEN_PATTERN = re.compile(r"\w+|[^\w\s]", re.UNICODE)
+
+def load_system_prompt(path: str = SYSTEM_PROMPT_PATH) -> Optional[str]:
+    """Load the comprehensive system prompt from the markdown file"""
+    return _load_prompt_block(path, None)
+
+def load_short_system_prompt(path: str = SYSTEM_PROMPT_PATH) -> Optional[str]:
+    """Load the compact manual used for short inputs"""
+    return _load_prompt_block(path, "## PROMPT CORTO")
+
+def select_system_prompt(text: str, path: str = SYSTEM_PROMPT_PATH) -> str:
+    """Pick the full or compact manual for a text, plus the response format"""
+    prompt = None
+    if len(text.split()) <= SHORT_INPUT_WORDS:
+        prompt = load_short_system_prompt(path)
+    if not prompt:
+        prompt = load_system_prompt(path) or BASIC_SYSTEM_PROMPT
+    return f"{prompt}\n\n{STRUCTURED_RESPONSE_INSTRUCTIONS}"
+
+def build_messages(system_prompt: str, user_content: str) -> List[Dict[str, str]]:
+    """Split a prompt into a stable system prefix and a variable user message"""
+    return [
+        {"role": "system", "content": system_prompt},
+        {"role": "user", "content": user_content}
+    ]
+
+def estimate_tokens(text: str) -> int:
+    """Estimate the token count of a text without a provider tokenizer"""
+    # Subword tokenizers split long Spanish words into several pieces
+    return sum(1 + len(piece) // 6 for piece in _TOKEN_PATTERN.findall(text))
+
+def prompt_token_report(messages: List[Dict[str, str]]) -> Dict[str, Any]:
+    """Report how many tokens of a request are static (cacheable) vs dynamic"""
+    static_tokens = sum(estimate_tokens(m["content"]) for m in messages if m["role"] == "system")
+    dynamic_tokens = sum(estimate_tokens(m["content"]) for m in messages if m["role"] != "system")
+    total_tokens = static_tokens + dynamic_tokens
+    return {
+        "static_tokens": static_tokens,
+        "dynamic_tokens": dynamic_tokens,
+        "total_tokens": total_tokens,
+        "static_ratio": static_tokens / total_tokens if total_tokens else 0.0
+    }
+
+def _load_prompt_block(path: str, heading: Optional[str]) -> Optional[str]:
+    """Load a prompt block, reloading only when the file changes"""
+    try:
+        mtime = os.path.getmtime(path)
+    except OSError as e:
+        print(f"Error loading system prompt: {e}")
+        return None
+    return _read_prompt_block(path, mtime, heading)
+
+@lru_cache(maxsize=8)
+def _read_prompt_block(path: str, mtime: float, heading: Optional[str]) -> Optional[str]:
+    """Extract the code block following a heading (or the first one) in the markdown file"""
+    try:
+        with open(path, 'r', encoding='utf-8') as f:
+            content = f.read()
+    except Exception as e:
+        print(f"Error loading system prompt: {e}")
+        return None
+
+    search_from = 0
+    if heading:
+        search_from = content.find(heading)
+        if search_from == -1:
+            return None
+
+    start_marker = "```\n"
+    end_marker = "\n```"
+    start_idx = content.find(start_marker, search_from)
+    if start_idx != -1:
+        start_idx += len(start_marker)
+        end_idx = content.find(end_marker, start_idx)
+        if end_idx != -1:
+            return content[start_idx:end_idx].strip()
+    return None
\ No newline at end of file
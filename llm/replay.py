@@ -0,0 +1,211 @@
+"""Recorded LLM responses, captured once from real runs and replayed deterministically.
+
+RecordingClient wraps a real Groq client and logs every call: its latency, its
+error if it failed, and the response the first time a request succeeds. The log
+is JSON lines, gzip-compressed when the path ends in ".gz". Each record is
+written as its own complete gzip member, so concurrent writers cannot interleave
+inside one. ReplayClient reads the log and answers the same requests without a
+network, duck-typing client.chat.completions.create(); llm.replay_server serves
+it over HTTP.
+"""
+import atexit
+import gzip
+import json
+import os
+import random
+import threading
+import time
+import zlib
+from typing import Dict, List, Any, Optional, Tuple
+
+from .singleflight import request_key
+
+class ReplayMissError(KeyError):
+    """Raised when a replayed request was never recorded"""
+    pass
+
+class ReplayedAPIError(Exception):
+    """An error the provider returned while recording, raised again on replay"""
+
+    def __init__(self, message: str, status_code: int):
+        super().__init__(message)
+        self.status_code = status_code
+
+class _Message:
+    def __init__(self, content: str):
+        self.role = "assistant"
+        self.content = content
+
+class _Choice:
+    def __init__(self, content: str):
+        self.index = 0
+        self.message = _Message(content)
+        self.finish_reason = "stop"
+
+class ChatCompletion:
+    """Minimal stand-in for the Groq chat completion response"""
+
+    def __init__(self, content: str, model: str = ""):
+        self.model = model
+        self.choices = [_Choice(content)]
+
+class _Completions:
+    def __init__(self, create):
+        self.create = create
+
+class _Chat:
+    def __init__(self, create):
+        self.completions = _Completions(create)
+
+def _open(path: str, mode: str):
+    if path.endswith(".gz"):
+        return gzip.open(path, mode, encoding="utf-8")
+    return open(path, mode, encoding="utf-8")
+
+class Recording:
+    """Responses per request key, plus the latency and outcome of every recorded call"""
+
+    def __init__(self, path: Optional[str] = None):
+        self.path = path
+        self.requests: Dict[str, Dict[str, Any]] = {}
+        self.responses: Dict[str, str] = {}
+        self.calls: List[Dict[str, Any]] = []
+        self._calls_by_key: Dict[str, List[Dict[str, Any]]] = {}
+        if path and os.path.exists(path):
+            try:
+                with _open(path, "rt") as f:
+                    for line in f:
+                        if line.strip():
+                            self.add(json.loads(line))
+            except (EOFError, ValueError, OSError, zlib.error) as e:
+                # A recording interrupted mid-write keeps its complete lines
+                print(f"Recording {path} is truncated: {e}")
+
+    def add(self, record: Dict[str, Any]):
+        key = record["key"]
+        if "request" in record:
+            self.requests[key] = record["request"]
+        if record.get("response") is not None:
+            self.responses.setdefault(key, record["response"])
+        call = {"key": key, "latency_ms": record.get("latency_ms", 0.0), "error": record.get("error")}
+        self.calls.append(call)
+        self._calls_by_key.setdefault(key, []).append(call)
+
+    def error_rate(self) -> float:
+        if not self.calls:
+            return 0.0
+        return sum(1 for call in self.calls if call["error"]) / len(self.calls)
+
+    def sample_call(self, key: str, rng: random.Random) -> Optional[Dict[str, Any]]:
+        """A recorded call for this request, or from the whole recording when it has none"""
+        calls = self._calls_by_key.get(key) or self.calls
+        return rng.choice(calls) if calls else None
+
+    def replay(self, key: str, rng: random.Random) -> Tuple[float, Optional[Dict[str, Any]], Optional[str]]:
+        """Latency in ms, recorded error and response for one replayed request"""
+        call = self.sample_call(key, rng)
+        latency_ms = call["latency_ms"] if call else 0.0
+        if call and call["error"]:
+            return latency_ms, call["error"], None
+        return latency_ms, None, self.responses.get(key)
+
+class _RecordingWriter:
+    """Appends records to one recording file; shared by every client recording to it"""
+
+    def __init__(self, path: str):
+        self.path = path
+        self.lock = threading.Lock()
+        self.recorded = set(Recording(path).responses)
+        self._compress = path.endswith(".gz")
+        # O_APPEND and one write per record keep records whole across processes too
+        self._fd: Optional[int] = os.open(path, os.O_WRONLY | os.O_APPEND | os.O_CREAT, 0o644)
+        atexit.register(self.close)
+
+    def write(self, record: Dict[str, Any]):
+        data = (json.dumps(record, ensure_ascii=False, separators=(",", ":")) + "\n").encode("utf-8")
+        if self._compress:
+            data = gzip.compress(data)
+        with self.lock:
+            if self._fd is not None:
+                os.write(self._fd, data)
+
+    def close(self):
+        with self.lock:
+            if self._fd is not None:
+                os.close(self._fd)
+                self._fd = None
+
+_writers: Dict[str, _RecordingWriter] = {}
+_writers_lock = threading.Lock()
+
+def _writer_for(path: str) -> _RecordingWriter:
+    """The process-wide writer of a recording file"""
+    path = os.path.abspath(path)
+    with _writers_lock:
+        writer = _writers.get(path)
+        if writer is None:
+            writer = _writers[path] = _RecordingWriter(path)
+        return writer
+
+class RecordingClient:
+    """Forwards requests to a real client and records each call"""
+
+    def __init__(self, client, path: str):
+        self.client = client
+        self.path = path
+        self._writer = _writer_for(path)
+        self.chat = _Chat(self._create)
+
+    def _create(self, **request) -> Any:
+        key = request_key(request)
+        start = time.perf_counter()
+        try:
+            completion = self.client.chat.completions.create(**request)
+        except Exception as e:
+            self._writer.write({
+                "key": key,
+                "latency_ms": (time.perf_counter() - start) * 1000,
+                "error": {"status_code": getattr(e, "status_code", 500), "message": str(e)}
+            })
+            raise
+
+        record = {"key": key, "latency_ms": (time.perf_counter() - start) * 1000}
+        with self._writer.lock:
+            if key not in self._writer.recorded:
+                self._writer.recorded.add(key)
+                record["request"] = request
+                record["response"] = completion.choices[0].message.content
+        self._writer.write(record)
+        return completion
+
+    def close(self):
+        """Close the recording file, for every client recording to it"""
+        self._writer.close()
+
+class ReplayClient:
+    """Answers requests from a recording, without network access"""
+
+    def __init__(self, path: str, reproduce_latency: bool = False, seed: int = 0):
+        self.path = path
+        self.recording = Recording(path)
+        self.reproduce_latency = reproduce_latency
+        self.misses: List[str] = []
+        self._rng = random.Random(seed)
+        self._lock = threading.Lock()
+        self.chat = _Chat(self._create)
+
+    def _create(self, **request) -> ChatCompletion:
+        key = request_key(request)
+        if self.reproduce_latency:
+            with self._lock:
+                latency_ms, error, response = self.recording.replay(key, self._rng)
+            time.sleep(latency_ms / 1000)
+            if error:
+                raise ReplayedAPIError(error["message"], error["status_code"])
+        else:
+            # Deterministic mode: always the recorded response, immediately
+            response = self.recording.responses.get(key)
+        if response is None:
+            self.misses.append(key)
+            raise ReplayMissError(f"Petición no grabada: {key[:12]}")
+        return ChatCompletion(response, request.get("model", ""))
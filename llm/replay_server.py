@@ -0,0 +1,117 @@
+"""Local HTTP stand-in for the Groq API, replaying a recording.
+
+Each request gets a latency and outcome sampled from the recorded calls for the
+same request, or from the whole recording for unseen ones, so load tests see
+the recorded latency distribution and error rate.
+
+Usage:
+    python -m llm.replay_server --recording llm_recording.jsonl.gz --port 8765
+    GROQ_BASE_URL=http://127.0.0.1:8765 GROQ_API_KEY=replay streamlit run app.py
+"""
+import argparse
+import json
+import os
+import random
+import threading
+import time
+import uuid
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Dict, Any
+
+from .backend import DEFAULT_RECORDING_PATH, LLM_RECORDING_ENV
+from .replay import Recording
+from .singleflight import request_key
+
+class ReplayServer(ThreadingHTTPServer):
+    """Threaded server sharing one recording across request handlers"""
+
+    daemon_threads = True
+    # Thousands of simulated users connect at once
+    request_queue_size = 4096
+
+    def __init__(self, address, recording: Recording, seed: int = 0, latency_scale: float = 1.0):
+        super().__init__(address, ReplayHandler)
+        self.recording = recording
+        self.latency_scale = latency_scale
+        self._rng = random.Random(seed)
+        self._rng_lock = threading.Lock()
+
+    def replay(self, key: str):
+        with self._rng_lock:
+            return self.recording.replay(key, self._rng)
+
+class ReplayHandler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"
+
+    def do_POST(self):
+        if not self.path.rstrip("/").endswith("/chat/completions"):
+            self._send_json(404, {"error": {"message": f"Unknown path {self.path}", "type": "not_found"}})
+            return
+        try:
+            length = int(self.headers.get("Content-Length", 0))
+            request = json.loads(self.rfile.read(length) or b"{}")
+        except ValueError as e:
+            self._send_json(400, {"error": {"message": f"Invalid JSON: {e}", "type": "invalid_request_error"}})
+            return
+
+        latency_ms, error, response = self.server.replay(request_key(request))
+        time.sleep(latency_ms * self.server.latency_scale / 1000)
+
+        if error:
+            self._send_json(error.get("status_code", 500), {
+                "error": {"message": error.get("message", ""), "type": "replayed_error"}
+            })
+        elif response is None:
+            self._send_json(404, {"error": {"message": "Request not in recording", "type": "replay_miss"}})
+        else:
+            self._send_json(200, _completion_payload(request, response))
+
+    def _send_json(self, status: int, payload: Dict[str, Any]):
+        body = json.dumps(payload, ensure_ascii=False).encode("utf-8")
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, format, *args):
+        pass  # one line per request would dominate a load test
+
+def _completion_payload(request: Dict[str, Any], content: str) -> Dict[str, Any]:
+    """Chat completion body in the shape the Groq client parses"""
+    return {
+        "id": f"chatcmpl-{uuid.uuid4().hex}",
+        "object": "chat.completion",
+        "created": int(time.time()),
+        "model": request.get("model", ""),
+        "choices": [{
+            "index": 0,
+            "message": {"role": "assistant", "content": content},
+            "finish_reason": "stop",
+            "logprobs": None
+        }],
+        "usage": {"prompt_tokens": 0, "completion_tokens": 0, "total_tokens": 0}
+    }
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Serve a recorded LLM session over a Groq-compatible HTTP API")
+    parser.add_argument("--recording", default=os.environ.get(LLM_RECORDING_ENV, DEFAULT_RECORDING_PATH))
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8765)
+    parser.add_argument("--seed", type=int, default=0, help="Seed for latency and error sampling")
+    parser.add_argument("--latency-scale", type=float, default=1.0, help="Multiply recorded latencies")
+    args = parser.parse_args(argv)
+
+    recording = Recording(args.recording)
+    server = ReplayServer((args.host, args.port), recording, args.seed, args.latency_scale)
+    print(f"Replaying {len(recording.responses)} responses from {len(recording.calls)} calls "
+          f"({recording.error_rate():.1%} errors) on http://{args.host}:{server.server_port}")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.server_close()
+
+if __name__ == "__main__":
+    main()
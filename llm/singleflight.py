@@ -0,0 +1,138 @@
+import hashlib
+import json
+import os
+import threading
+import time
+from typing import Dict, Any, Callable, Optional
+
+import metrics
+import tracing
+
+try:
+    import fcntl
+except ImportError:
+    # Cross-process coalescing relies on POSIX file locks
+    fcntl = None
+
+# Environment variable pointing to a directory shared by worker processes
+SINGLEFLIGHT_DIR_ENV = "ACLARADOR_SINGLEFLIGHT_DIR"
+
+# Flight files older than this were left by crashed processes
+STALE_FLIGHT_SECONDS = 3600.0
+
+class _Call:
+    """An in-flight call that other threads can wait on"""
+
+    def __init__(self):
+        self.done = threading.Event()
+        self.result: Any = None
+        self.error: Optional[BaseException] = None
+
+class SingleFlight:
+    """Coalesces concurrent calls with the same key into a single execution"""
+
+    def __init__(self, lock_dir: Optional[str] = None):
+        self._lock = threading.Lock()
+        self._calls: Dict[str, _Call] = {}
+        self.lock_dir = lock_dir if fcntl is not None else None
+        if self.lock_dir:
+            os.makedirs(self.lock_dir, exist_ok=True)
+            self._remove_stale_flights()
+
+    def do(self, key: str, fn: Callable[[], Any]) -> Any:
+        """Run fn once per key at a time; concurrent callers share its result"""
+        with self._lock:
+            call = self._calls.get(key)
+            leader = call is None
+            if leader:
+                call = _Call()
+                self._calls[key] = call
+
+        if not leader:
+            metrics.increment("llm_requests_coalesced")
+            call.done.wait()
+            if call.error is not None:
+                raise call.error
+            return call.result
+
+        try:
+            if self.lock_dir:
+                call.result = self._do_across_processes(key, fn)
+            else:
+                call.result = fn()
+        except BaseException as e:
+            call.error = e
+            raise
+        finally:
+            with self._lock:
+                del self._calls[key]
+            call.done.set()
+        return call.result
+
+    def _do_across_processes(self, key: str, fn: Callable[[], Any]) -> Any:
+        """Share one in-flight call per key across processes through a flight file"""
+        # Callers that open the file while the leader holds its lock wait for it and
+        # read the result it writes there. The leader unlinks the file before
+        # unlocking, so later callers start a new flight: nothing is cached
+        flight_path = os.path.join(self.lock_dir, f"{key}.flight")
+        with open(flight_path, "a+", encoding="utf-8") as flight:
+            fcntl.flock(flight, fcntl.LOCK_EX)
+            try:
+                flight.seek(0)
+                try:
+                    shared = json.loads(flight.read() or "null")
+                except ValueError:
+                    shared = None  # the leader died while writing
+                if shared is not None:
+                    metrics.increment("llm_requests_coalesced_cross_process")
+                    return shared["result"]
+
+                # No result: lead the flight (a failed leader leaves its waiters to retry)
+                result = fn()
+                flight.truncate(0)
+                flight.write(json.dumps({"result": result}))
+                flight.flush()
+                return result
+            finally:
+                self._unlink_flight(flight_path, flight)
+                fcntl.flock(flight, fcntl.LOCK_UN)
+
+    def _unlink_flight(self, flight_path: str, flight):
+        """Remove the flight file, unless the path already belongs to a newer flight"""
+        try:
+            if os.stat(flight_path).st_ino == os.fstat(flight.fileno()).st_ino:
+                os.remove(flight_path)
+        except OSError:
+            pass
+
+    def _remove_stale_flights(self):
+        """Delete files left by processes that died mid-flight"""
+        now = time.time()
+        for name in os.listdir(self.lock_dir):
+            path = os.path.join(self.lock_dir, name)
+            try:
+                if now - os.path.getmtime(path) < STALE_FLIGHT_SECONDS:
+                    continue
+                with open(path, "a") as f:
+                    # Skip files whose flight is still running
+                    fcntl.flock(f, fcntl.LOCK_EX | fcntl.LOCK_NB)
+                    os.remove(path)
+            except OSError:
+                pass
+
+def request_key(request: Dict[str, Any]) -> str:
+    """Stable key for an LLM request (model, messages and sampling parameters)"""
+    payload = json.dumps(request, sort_keys=True, ensure_ascii=False)
+    return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+default_flight = SingleFlight(os.environ.get(SINGLEFLIGHT_DIR_ENV))
+
+def coalesced_completion(client, **request) -> str:
+    """Create a chat completion, sharing in-flight calls for identical requests"""
+    def call():
+        metrics.increment("llm_calls")
+        with tracing.span("llm_call", model=request.get("model")):
+            chat_completion = client.chat.completions.create(**request)
+        return chat_completion.choices[0].message.content
+
+    return default_flight.do(request_key(request), call)
\ No newline at end of file
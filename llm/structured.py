@@ -0,0 +1,197 @@
+import json
+from typing import Dict, List, Any, Optional
+
+EDIT_TYPES = [
+    "structure",
+    "sentence_length",
+    "voice",
+    "vocabulary",
+    "grammar",
+    "punctuation",
+    "seo",
+    "other"
+]
+
+# Type given to edits whose type the model made up
+EDIT_TYPE_OTHER = "other"
+
+EDIT_SCHEMA = {
+    "type": "object",
+    "required": ["type", "original", "corrected", "reason"],
+    "properties": {
+        "type": {"type": "string", "enum": EDIT_TYPES},
+        "original": {"type": "string"},
+        "corrected": {"type": "string"},
+        "reason": {"type": "string"},
+        "rule": {"type": "string"}
+    }
+}
+
+# JSON schema of the single-call rewrite and critique response
+REWRITE_SCHEMA = {
+    "type": "object",
+    "required": ["rewritten_text", "edits"],
+    "properties": {
+        "rewritten_text": {"type": "string", "minLength": 1},
+        "edits": {"type": "array", "items": EDIT_SCHEMA},
+        "principles": {"type": "array", "items": {"type": "string"}}
+    }
+}
+
+STRUCTURED_RESPONSE_INSTRUCTIONS = """Responde ÚNICAMENTE con un objeto JSON válido, sin texto adicional, con esta estructura:
+{
+  "rewritten_text": "texto completo reescrito",
+  "edits": [
+    {
+      "type": "structure | sentence_length | voice | vocabulary | grammar | punctuation | seo",
+      "original": "fragmento literal del texto original",
+      "corrected": "fragmento que lo sustituye",
+      "reason": "por qué mejora la claridad",
+      "rule": "principio o sección del manual aplicado"
+    }
+  ],
+  "principles": ["principios del manual aplicados"]
+}
+Copia "original" exactamente como aparece en el texto original."""
+
+EDIT_TYPE_LABELS = {
+    "structure": "Estructura y claridad",
+    "sentence_length": "Estructura y claridad",
+    "voice": "Vocabulario y estilo",
+    "vocabulary": "Vocabulario y estilo",
+    "grammar": "Gramática y puntuación",
+    "punctuation": "Gramática y puntuación",
+    "seo": "Adaptación digital",
+    "other": "Otras mejoras"
+}
+
+class StructuredOutputError(ValueError):
+    """Raised when an LLM response does not match the expected schema"""
+    pass
+
+def parse_structured_rewrite(response: str, original_text: str) -> Dict[str, Any]:
+    """Parse and validate a structured rewrite response, locating edit spans"""
+    try:
+        data = json.loads(_strip_code_fence(response))
+    except json.JSONDecodeError as e:
+        raise StructuredOutputError(f"Respuesta JSON no válida: {e}")
+
+    if isinstance(data, dict) and isinstance(data.get("edits"), list):
+        data["edits"] = _valid_edits(data["edits"])
+    errors = validate_schema(data, REWRITE_SCHEMA)
+    if errors:
+        raise StructuredOutputError("; ".join(errors))
+
+    data["rewritten_text"] = data["rewritten_text"].strip()
+    data.setdefault("principles", [])
+    data["edits"] = locate_spans(data["edits"], original_text)
+    return data
+
+def _valid_edits(edits: List[Any]) -> List[Dict[str, Any]]:
+    """Keep the rewrite usable when single edits are off-schema"""
+    # Unknown types become "other"; edits that are still invalid are dropped
+    valid = []
+    for edit in edits:
+        if isinstance(edit, dict) and isinstance(edit.get("type"), str) and edit["type"] not in EDIT_TYPES:
+            edit = dict(edit, type=EDIT_TYPE_OTHER)
+        if not validate_schema(edit, EDIT_SCHEMA):
+            valid.append(edit)
+    return valid
+
+def validate_schema(value: Any, schema: Dict[str, Any], path: str = "$") -> List[str]:
+    """Validate a value against the subset of JSON schema used by REWRITE_SCHEMA"""
+    errors = []
+    expected = schema.get("type")
+
+    if expected == "object":
+        if not isinstance(value, dict):
+            return [f"{path}: se esperaba un objeto"]
+        for key in schema.get("required", []):
+            if key not in value:
+                errors.append(f"{path}.{key}: campo obligatorio ausente")
+        for key, subschema in schema.get("properties", {}).items():
+            if key in value:
+                errors.extend(validate_schema(value[key], subschema, f"{path}.{key}"))
+    elif expected == "array":
+        if not isinstance(value, list):
+            return [f"{path}: se esperaba una lista"]
+        for i, item in enumerate(value):
+            errors.extend(validate_schema(item, schema.get("items", {}), f"{path}[{i}]"))
+    elif expected == "string":
+        if not isinstance(value, str):
+            return [f"{path}: se esperaba una cadena"]
+        if len(value.strip()) < schema.get("minLength", 0):
+            errors.append(f"{path}: cadena vacía")
+        if "enum" in schema and value not in schema["enum"]:
+            errors.append(f"{path}: valor '{value}' no permitido")
+
+    return errors
+
+def edits_to_improvements(edits: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+    """Convert typed edits into the improvement format used by the coordinator"""
+    improvements = []
+    for edit in edits:
+        improvements.append({
+            "type": edit["type"],
+            "description": f"{edit['original']} → {edit['corrected']}",
+            "reason": edit["reason"],
+            "reference": edit.get("rule", ""),
+            "original": edit["original"],
+            "corrected": edit["corrected"],
+            "start": edit["start"],
+            "end": edit["end"]
+        })
+    return improvements
+
+def render_markdown(result: Dict[str, Any]) -> str:
+    """Render a structured rewrite as the markdown report shown in the app"""
+    output = ["### TEXTO CORREGIDO", result["rewritten_text"], ""]
+
+    if result["edits"]:
+        output.append("### EXPLICACIÓN DE MEJORAS")
+        sections: Dict[str, List[str]] = {}
+        for edit in result["edits"]:
+            label = EDIT_TYPE_LABELS.get(edit["type"], "Otras mejoras")
+            line = f"- «{edit['original']}» → «{edit['corrected']}»: {edit['reason']}"
+            if edit.get("rule"):
+                line += f" *({edit['rule']})*"
+            sections.setdefault(label, []).append(line)
+        for i, (label, lines) in enumerate(sections.items(), 1):
+            output.append(f"**{i}. {label}:**")
+            output.extend(lines)
+            output.append("")
+
+    if result.get("principles"):
+        output.append("### PRINCIPIOS APLICADOS")
+        output.extend(f"- {principle}" for principle in result["principles"])
+
+    return "\n".join(output).strip()
+
+def locate_spans(edits: List[Dict[str, Any]], original_text: str) -> List[Dict[str, Any]]:
+    """Attach [start, end) offsets in the original text to each edit"""
+    located = []
+    cursor = 0
+    for edit in edits:
+        fragment = edit["original"]
+        start: Optional[int] = None
+        if fragment:
+            # Edits usually arrive in reading order; fall back to a global search
+            start = original_text.find(fragment, cursor)
+            if start == -1:
+                start = original_text.find(fragment)
+        if start is not None and start >= 0:
+            edit["start"], edit["end"] = start, start + len(fragment)
+            cursor = edit["end"]
+        else:
+            edit["start"], edit["end"] = None, None
+        located.append(edit)
+    return located
+
+def _strip_code_fence(response: str) -> str:
+    """Remove a markdown code fence wrapped around a JSON payload"""
+    response = response.strip()
+    if response.startswith("```"):
+        response = response.split("\n", 1)[1] if "\n" in response else ""
+        if response.rstrip().endswith("```"):
+            response = response.rstrip()[:-3]
+    return response.strip()
\ No newline at end of file
@@ -0,0 +1,38 @@
+import threading
+from typing import Dict, Any
+
+_lock = threading.Lock()
+_counters: Dict[str, int] = {}
+_timings: Dict[str, Dict[str, float]] = {}
+
+def increment(name: str, value: int = 1):
+    """Increase a process-wide counter"""
+    with _lock:
+        _counters[name] = _counters.get(name, 0) + value
+
+def observe(name: str, value: float):
+    """Record one observation (e.g. a latency in milliseconds)"""
+    with _lock:
+        stats = _timings.get(name)
+        if stats is None:
+            _timings[name] = {"count": 1, "sum": value, "min": value, "max": value, "last": value}
+        else:
+            stats["count"] += 1
+            stats["sum"] += value
+            stats["min"] = min(stats["min"], value)
+            stats["max"] = max(stats["max"], value)
+            stats["last"] = value
+
+def snapshot() -> Dict[str, Any]:
+    """Return a copy of all counters and timing summaries"""
+    with _lock:
+        timings = {}
+        for name, stats in _timings.items():
+            timings[name] = dict(stats, mean=stats["sum"] / stats["count"])
+        return {"counters": dict(_counters), "timings": timings}
+
+def reset():
+    """Clear all metrics"""
+    with _lock:
+        _counters.clear()
+        _timings.clear()
\ No newline at end of file
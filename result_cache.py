@@ -0,0 +1,189 @@
+import hashlib
+import json
+import os
+import shutil
+import tempfile
+import threading
+import zlib
+from collections import OrderedDict
+from typing import Dict, List, Any, Optional
+
+import metrics
+
+try:
+    import msgpack
+except ImportError:
+    msgpack = None
+
+# Environment variable overriding the on-disk cache location
+RESULT_CACHE_DIR_ENV = "ACLARADOR_RESULT_CACHE_DIR"
+
+_FORMAT_MSGPACK = b"M"
+_FORMAT_JSON = b"J"
+
+def _encode(value: Dict[str, Any]) -> bytes:
+    if msgpack is not None:
+        try:
+            return _FORMAT_MSGPACK + msgpack.packb(value, use_bin_type=True, default=str)
+        except (TypeError, ValueError, OverflowError):
+            pass  # e.g. integers beyond 64 bits; JSON has no such limit
+    return _FORMAT_JSON + json.dumps(value, ensure_ascii=False, separators=(",", ":"), default=str).encode("utf-8")
+
+def _decode(data: bytes) -> Optional[Dict[str, Any]]:
+    """Decoded entry, or None when it was written with msgpack and msgpack is missing here"""
+    if data[:1] == _FORMAT_MSGPACK:
+        if msgpack is None:
+            return None
+        return msgpack.unpackb(data[1:], raw=False)
+    return json.loads(data[1:].decode("utf-8"))
+
+class ResultCache:
+    """Two-tier (memory + compressed disk) LRU cache of complete pipeline results"""
+
+    def __init__(self, directory: Optional[str] = None, max_entries: int = 2000,
+                 memory_entries: int = 256):
+        self.directory = directory or os.environ.get(
+            RESULT_CACHE_DIR_ENV, os.path.join(tempfile.gettempdir(), "aclarador_results")
+        )
+        self.max_entries = max_entries
+        self.memory_entries = memory_entries
+        self._memory: "OrderedDict[str, bytes]" = OrderedDict()
+        self._lock = threading.Lock()
+        self._fingerprint: Optional[str] = None
+        self._disk_entries = 0
+
+    def key(self, fingerprint: str, text: str, **params) -> str:
+        """Cache key for a text processed under a pipeline fingerprint and parameters"""
+        text_hash = hashlib.sha256(text.encode("utf-8")).hexdigest()
+        payload = json.dumps([fingerprint, text_hash, params], sort_keys=True, default=str)
+        return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+    def get(self, fingerprint: str, key: str) -> Optional[Dict[str, Any]]:
+        """Return a fresh copy of a cached result, or None"""
+        self._bind(fingerprint)
+        with self._lock:
+            data = self._memory.get(key)
+            if data is not None:
+                self._memory.move_to_end(key)
+        path = self._path(key)
+        if data is None:
+            try:
+                with open(path, "rb") as f:
+                    data = zlib.decompress(f.read())
+                os.utime(path)  # mark as recently used for disk eviction
+            except (OSError, zlib.error):
+                metrics.increment("result_cache_misses")
+                return None
+            self._remember(key, data)
+        else:
+            try:
+                os.utime(path)  # memory hits keep the disk copy recent too
+            except OSError:
+                pass  # evicted from disk, or written by a failed put
+        value = _decode(data)
+        if value is None:
+            metrics.increment("result_cache_misses")
+            return None
+        metrics.increment("result_cache_hits")
+        return value
+
+    def put(self, fingerprint: str, key: str, value: Dict[str, Any]):
+        """Store a result in memory and on disk, evicting least recently used entries"""
+        self._bind(fingerprint)
+        try:
+            data = _encode(value)
+        except (TypeError, ValueError) as e:
+            # An unserializable result is still returned to the caller, just not cached
+            print(f"Could not encode result cache entry: {e}")
+            return
+        self._remember(key, data)
+
+        path = self._path(key)
+        try:
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+            is_new = not os.path.exists(path)
+            tmp_path = f"{path}.{os.getpid()}.{threading.get_ident()}.tmp"
+            with open(tmp_path, "wb") as f:
+                f.write(zlib.compress(data, 6))
+            os.replace(tmp_path, path)
+        except OSError as e:
+            print(f"Could not write result cache entry: {e}")
+            return
+
+        if not is_new:
+            return
+        with self._lock:
+            self._disk_entries += 1
+            evict = self._disk_entries > self.max_entries
+        if evict:
+            self._evict_disk()
+
+    def clear(self):
+        """Remove every cached result"""
+        with self._lock:
+            self._memory.clear()
+            self._disk_entries = 0
+        shutil.rmtree(self.directory, ignore_errors=True)
+
+    def _bind(self, fingerprint: str):
+        """Switch to the entries of the current pipeline version"""
+        # Entries of other versions are left on disk: processes on another version
+        # (e.g. during a rolling deploy) may still use them. They stop being touched
+        # and are the first to go when the disk tier is evicted
+        if fingerprint == self._fingerprint:
+            return
+        disk_entries = len(self._disk_files())
+        with self._lock:
+            self._fingerprint = fingerprint
+            self._memory.clear()
+            self._disk_entries = disk_entries
+
+    def _disk_files(self) -> List[str]:
+        """Entry files of every pipeline version in the cache directory"""
+        files = []
+        try:
+            versions = os.listdir(self.directory)
+        except OSError:
+            return files
+        for version in versions:
+            try:
+                names = os.listdir(os.path.join(self.directory, version))
+            except OSError:
+                continue
+            files.extend(os.path.join(self.directory, version, name) for name in names if name.endswith(".bin"))
+        return files
+
+    def _remember(self, key: str, data: bytes):
+        with self._lock:
+            self._memory[key] = data
+            self._memory.move_to_end(key)
+            while len(self._memory) > self.memory_entries:
+                self._memory.popitem(last=False)
+
+    def _evict_disk(self):
+        """Delete the least recently used files, of any version, down to 90% of capacity"""
+        entries = []
+        for path in self._disk_files():
+            try:
+                entries.append((os.path.getmtime(path), path))
+            except OSError:
+                pass  # removed by another process
+        entries.sort()
+        excess = len(entries) - int(self.max_entries * 0.9)
+        for _, path in entries[:max(excess, 0)]:
+            try:
+                os.remove(path)
+            except OSError:
+                pass
+        # Directories of versions whose last entry was evicted
+        for version in {os.path.dirname(path) for _, path in entries[:max(excess, 0)]}:
+            if version != os.path.dirname(self._path("")):
+                try:
+                    os.rmdir(version)
+                except OSError:
+                    pass  # not empty
+        with self._lock:
+            self._disk_entries = len(entries) - max(excess, 0)
+
+    def _path(self, key: str) -> str:
+        return os.path.join(self.directory, self._fingerprint[:16], f"{key}.bin")
\ No newline at end of file
@@ -0,0 +1,41 @@
+"""Web entry point for autoscaled deployments.
+
+Warms up the process, then runs Streamlit in the same process so app.py reuses
+the warmed coordinator and LLM client. Streamlit binds PORT only once the
+warm-up is done, which is what Heroku's router waits for; /_stcore/health on
+PORT is the health check there. Platforms probing a separate port set
+HEALTH_PORT: /healthz, /readyz and /metrics are served there from the start,
+and /readyz answers 503 until the warm-up is done and Streamlit accepts
+connections.
+
+Long documents are processed by job worker threads in this same process, which
+shares the queue file with the app (dynos do not share a filesystem).
+
+Usage: python serve.py   (PORT for Streamlit, optional HEALTH_PORT for the
+probes, ACLARADOR_WEB_WORKERS for the number of job worker threads, and
+ACLARADOR_SHARD_WORKERS to analyze very long queued documents across that many
+processes, above ACLARADOR_SHARD_MIN_CHARS characters)
+"""
+import os
+
+from jobs.worker import start_worker_threads
+from warmup import ReadinessState, shared_coordinator, start_health_server, warm_up
+
+WEB_WORKERS_ENV = "ACLARADOR_WEB_WORKERS"
+
+APP_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), "app.py")
+
+def main():
+    port = int(os.environ.get("PORT", 8501))
+    state = ReadinessState()
+    start_health_server(state, app_port=port)
+    warm_up(state)
+    start_worker_threads(int(os.environ.get(WEB_WORKERS_ENV, 1)), coordinator=shared_coordinator())
+
+    from streamlit.web import bootstrap
+    flag_options = {"server_port": port, "server_address": "0.0.0.0", "server_headless": True}
+    bootstrap.load_config_options(flag_options=flag_options)
+    bootstrap.run(APP_PATH, False, [], flag_options)
+
+if __name__ == "__main__":
+    main()
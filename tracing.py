@@ -0,0 +1,295 @@
+"""Per-request tracing with head sampling, tail sampling and batched export.
+
+Every request records its spans in memory, which costs a few microseconds.
+When the request ends, the policy decides whether to keep the trace. A trace
+is kept if it was head-sampled, if it failed, or if it was slower than the
+slow-request threshold. Kept traces are queued for a background thread that
+exports them in batches, so the request path never does export I/O.
+"""
+import json
+import os
+import queue
+import random
+import threading
+import time
+import uuid
+from contextlib import contextmanager
+from contextvars import ContextVar
+from datetime import datetime, timedelta, timezone
+from typing import Dict, List, Any, Callable, Optional
+
+import metrics
+
+# Environment variables configuring the default tracer
+TRACE_SAMPLE_RATE_ENV = "ACLARADOR_TRACE_SAMPLE_RATE"
+TRACE_SLOW_MS_ENV = "ACLARADOR_TRACE_SLOW_MS"
+TRACE_EXPORTER_ENV = "ACLARADOR_TRACE_EXPORTER"  # file | langsmith | none
+TRACE_FILE_ENV = "ACLARADOR_TRACE_FILE"
+
+DEFAULT_SAMPLE_RATE = 0.05
+DEFAULT_SLOW_MS = 8000.0
+DEFAULT_TRACE_FILE = "aclarador_traces.jsonl"
+
+# Budget for the tracer's own work on the request path (span bookkeeping and the
+# sampling decision, not export), per request
+OVERHEAD_BUDGET_US = 100.0
+
+_current_trace: ContextVar[Optional["Trace"]] = ContextVar("aclarador_trace", default=None)
+
+class Trace:
+    """Spans of one request, kept in memory until the sampling decision"""
+
+    def __init__(self, name: str, head_sampled: bool, attributes: Dict[str, Any] = None):
+        self.name = name
+        self.head_sampled = head_sampled
+        self.attributes = dict(attributes or {})
+        self.start_time = time.time()
+        self._start = time.perf_counter()
+        self.duration_ms: Optional[float] = None
+        self.error: Optional[str] = None
+        self.spans: List[Dict[str, Any]] = []
+        self._stack: List[int] = []
+        self.overhead_ns = 0
+
+    def set_error(self, error: Any):
+        self.error = str(error)
+
+    @contextmanager
+    def span(self, name: str, **attributes):
+        """Time a step of the request; exceptions are recorded and re-raised"""
+        entered = time.perf_counter_ns()
+        index = len(self.spans)
+        record = {
+            "name": name,
+            "parent": self._stack[-1] if self._stack else None,
+            "attributes": attributes,
+            "error": None
+        }
+        self.spans.append(record)
+        self._stack.append(index)
+        start = time.perf_counter()
+        self.overhead_ns += time.perf_counter_ns() - entered
+        try:
+            yield record
+        except BaseException as e:
+            record["error"] = repr(e)
+            raise
+        finally:
+            end = time.perf_counter()
+            leaving = time.perf_counter_ns()
+            record["start_ms"] = (start - self._start) * 1000
+            record["duration_ms"] = (end - start) * 1000
+            self._stack.pop()
+            self.overhead_ns += time.perf_counter_ns() - leaving
+
+    def to_dict(self) -> Dict[str, Any]:
+        # The id is only needed for kept traces
+        return {
+            "id": uuid.uuid4().hex,
+            "name": self.name,
+            "start_time": self.start_time,
+            "duration_ms": self.duration_ms,
+            "error": self.error,
+            "head_sampled": self.head_sampled,
+            "attributes": self.attributes,
+            "spans": self.spans
+        }
+
+class SamplingPolicy:
+    """Decides which finished traces are exported"""
+
+    def __init__(self, sample_rate: float = DEFAULT_SAMPLE_RATE, slow_ms: Optional[float] = DEFAULT_SLOW_MS,
+                 always_on_error: bool = True, seed: Optional[int] = None):
+        self.sample_rate = sample_rate
+        self.slow_ms = slow_ms
+        self.always_on_error = always_on_error
+        self._random = random.Random(seed)
+
+    def head_sample(self) -> bool:
+        """Decision taken when the request starts"""
+        return self._random.random() < self.sample_rate
+
+    def keep(self, trace: Trace) -> bool:
+        """Decision taken when the request ends: head sample, errors and slow requests"""
+        if trace.head_sampled:
+            return True
+        if self.always_on_error and (trace.error or any(span["error"] for span in trace.spans)):
+            return True
+        return self.slow_ms is not None and trace.duration_ms >= self.slow_ms
+
+class FileExporter:
+    """Appends traces as JSON lines to a local file, for offline inspection"""
+
+    def __init__(self, path: str = DEFAULT_TRACE_FILE):
+        self.path = path
+
+    def __call__(self, batch: List[Dict[str, Any]]):
+        lines = "".join(json.dumps(trace, ensure_ascii=False, default=str) + "\n" for trace in batch)
+        with open(self.path, "a", encoding="utf-8") as f:
+            f.write(lines)
+
+class LangSmithExporter:
+    """Sends traces to LangSmith as runs, with each span as a child run"""
+
+    def __init__(self, project_name: str = "aclarador"):
+        from langsmith import Client
+        self.client = Client()
+        self.project_name = project_name
+
+    def __call__(self, batch: List[Dict[str, Any]]):
+        for trace in batch:
+            # Runs carry the recorded times, not the time of the batch export
+            start = datetime.fromtimestamp(trace["start_time"], tz=timezone.utc)
+            run_id = uuid.UUID(trace["id"])
+            self.client.create_run(
+                id=run_id,
+                name=trace["name"],
+                run_type="chain",
+                inputs=trace["attributes"],
+                outputs={"duration_ms": trace["duration_ms"]},
+                error=trace["error"],
+                start_time=start,
+                end_time=start + timedelta(milliseconds=trace["duration_ms"]),
+                project_name=self.project_name
+            )
+            span_ids = []
+            for span in trace["spans"]:
+                span_id = uuid.uuid4()
+                span_ids.append(span_id)
+                span_start = start + timedelta(milliseconds=span["start_ms"])
+                self.client.create_run(
+                    id=span_id,
+                    parent_run_id=run_id if span["parent"] is None else span_ids[span["parent"]],
+                    name=span["name"],
+                    run_type="chain",
+                    inputs=span["attributes"],
+                    outputs={"duration_ms": span["duration_ms"]},
+                    error=span["error"],
+                    start_time=span_start,
+                    end_time=span_start + timedelta(milliseconds=span["duration_ms"]),
+                    project_name=self.project_name
+                )
+
+class BatchExporter:
+    """Queues kept traces and exports them in batches from a background thread"""
+
+    def __init__(self, sink: Callable[[List[Dict[str, Any]]], None], batch_size: int = 50,
+                 flush_interval: float = 2.0, max_queue: int = 10000):
+        self.sink = sink
+        self.batch_size = batch_size
+        self.flush_interval = flush_interval
+        self._queue: "queue.Queue[Optional[Dict[str, Any]]]" = queue.Queue(maxsize=max_queue)
+        self._thread = threading.Thread(target=self._run, name="trace-exporter", daemon=True)
+        self._thread.start()
+
+    def submit(self, trace: Dict[str, Any]):
+        """Queue a trace without blocking; drops it when the exporter is backed up"""
+        try:
+            self._queue.put_nowait(trace)
+        except queue.Full:
+            metrics.increment("traces_dropped")
+
+    def close(self, timeout: float = 5.0):
+        """Export what is queued and stop the thread"""
+        self._queue.put(None)
+        self._thread.join(timeout)
+
+    def _run(self):
+        stopping = False
+        while not stopping:
+            # Collect until the batch is full or the flush interval elapses
+            batch = []
+            deadline = time.monotonic() + self.flush_interval
+            while len(batch) < self.batch_size:
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    break
+                try:
+                    trace = self._queue.get(timeout=remaining)
+                except queue.Empty:
+                    break
+                if trace is None:
+                    stopping = True
+                    break
+                batch.append(trace)
+            if batch:
+                self._export(batch)
+
+    def _export(self, batch: List[Dict[str, Any]]):
+        try:
+            self.sink(batch)
+            metrics.increment("traces_exported", len(batch))
+        except Exception as e:
+            metrics.increment("traces_export_errors")
+            print(f"Could not export {len(batch)} traces: {e}")
+
+class Tracer:
+    """Creates per-request traces and hands the kept ones to the exporter"""
+
+    def __init__(self, policy: Optional[SamplingPolicy] = None, exporter: Optional[BatchExporter] = None):
+        self.policy = policy or SamplingPolicy()
+        self.exporter = exporter
+
+    @property
+    def enabled(self) -> bool:
+        return self.exporter is not None
+
+    @contextmanager
+    def trace(self, name: str, force: bool = False, **attributes):
+        """Trace one request; force=True keeps it regardless of sampling"""
+        if self.exporter is None:
+            yield None
+            return
+
+        entered = time.perf_counter_ns()
+        trace = Trace(name, force or self.policy.head_sample(), attributes)
+        token = _current_trace.set(trace)
+        trace.overhead_ns += time.perf_counter_ns() - entered
+        try:
+            yield trace
+        except BaseException as e:
+            trace.set_error(repr(e))
+            raise
+        finally:
+            leaving = time.perf_counter_ns()
+            trace.duration_ms = (time.perf_counter() - trace._start) * 1000
+            _current_trace.reset(token)
+            kept = self.policy.keep(trace)
+            if kept:
+                self.exporter.submit(trace.to_dict())
+            overhead_ns = trace.overhead_ns + time.perf_counter_ns() - leaving
+            metrics.observe("tracing_overhead_us", overhead_ns / 1000)
+            metrics.increment("traces_kept" if kept else "traces_discarded")
+
+@contextmanager
+def span(name: str, **attributes):
+    """Span in the current request's trace; does nothing outside a traced request"""
+    trace = _current_trace.get()
+    if trace is None:
+        yield None
+        return
+    with trace.span(name, **attributes) as record:
+        yield record
+
+def current_trace() -> Optional[Trace]:
+    return _current_trace.get()
+
+def build_tracer() -> Tracer:
+    """Tracer configured from the environment"""
+    exporter_name = os.environ.get(TRACE_EXPORTER_ENV, "file")
+    policy = SamplingPolicy(
+        sample_rate=float(os.environ.get(TRACE_SAMPLE_RATE_ENV, DEFAULT_SAMPLE_RATE)),
+        slow_ms=float(os.environ.get(TRACE_SLOW_MS_ENV, DEFAULT_SLOW_MS))
+    )
+    if exporter_name == "none":
+        return Tracer(policy, None)
+
+    sink = None
+    if exporter_name == "langsmith":
+        try:
+            sink = LangSmithExporter()
+        except Exception as e:
+            print(f"LangSmith exporter not available ({e}), writing traces to a file")
+    if sink is None:
+        sink = FileExporter(os.environ.get(TRACE_FILE_ENV, DEFAULT_TRACE_FILE))
+    return Tracer(policy, BatchExporter(sink))
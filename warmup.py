@@ -0,0 +1,228 @@
+"""Warm-up of process-wide resources and the health/readiness endpoint.
+
+serve.py runs warm_up() in the web process before Streamlit accepts traffic.
+warm_up() builds the shared coordinator (agents, lexicon index, knowledge
+base), loads both system prompts, runs a synthetic request through the
+heuristic agents to fill the tokenizer and syllable caches, and sends a
+synthetic LLM request that opens the client's connection pool. app.py then
+reuses the same coordinator and client, so the first user request costs about
+the same as later ones.
+
+The health server only runs when HEALTH_PORT is set, for platforms whose
+probes use their own port; see serve.py. Besides /healthz and /readyz it serves
+/metrics, the process counters (LLM calls, coalesced requests) and timings.
+"""
+import json
+import os
+import socket
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Dict, List, Any, Optional
+
+import metrics
+
+# Environment variables read by the warm-up and the health server
+HEALTH_PORT_ENV = "HEALTH_PORT"
+USE_KNOWLEDGE_BASE_ENV = "ACLARADOR_USE_KNOWLEDGE_BASE"
+
+SYNTHETIC_TEXT = (
+    "Por medio de la presente se le comunica que la solicitud fue aprobada por la comisión "
+    "y que, con el fin de proceder a la tramitación del expediente, deberá aportar la "
+    "documentación requerida en el plazo de diez días hábiles. Si el es el titular, tu puedes firmar."
+)
+
+_lock = threading.Lock()
+_coordinator = None
+_client = None
+_first_request_recorded = False
+
+def shared_client():
+    """LLM client shared by the app and the rewriter, so they use one connection pool"""
+    global _client
+    with _lock:
+        if _client is None:
+            from llm.backend import create_client
+            _client = create_client()
+        return _client
+
+def shared_coordinator():
+    """Coordinator built once per process and reused by every session"""
+    global _coordinator
+    client = shared_client()
+    with _lock:
+        if _coordinator is None:
+            from agent_coordinator import AgentCoordinator
+            from agents.sharding import executor_from_env
+            _coordinator = AgentCoordinator(
+                use_knowledge_base=os.environ.get(USE_KNOWLEDGE_BASE_ENV, "").lower() in ("1", "true", "yes"),
+                # Only documents far above the app's queueing threshold are sharded, so in
+                # practice this applies to the job worker threads sharing the coordinator
+                sharded_executor=executor_from_env()
+            )
+            if _coordinator.rewriter is not None and client is not None:
+                _coordinator.rewriter.client = client
+        return _coordinator
+
+def record_request_latency(latency_ms: float):
+    """Observe a user request latency; the first one in the process is also kept apart"""
+    global _first_request_recorded
+    with _lock:
+        first = not _first_request_recorded
+        _first_request_recorded = True
+    if first:
+        metrics.observe("first_request_latency_ms", latency_ms)
+    metrics.observe("request_latency_ms", latency_ms)
+
+class ReadinessState:
+    """Progress of the warm-up, reported by the health endpoint"""
+
+    def __init__(self):
+        self.ready = False
+        self.steps: List[Dict[str, Any]] = []
+        self._lock = threading.Lock()
+
+    def record(self, step: str, duration_ms: float, error: Optional[str] = None,
+               skipped: Optional[str] = None):
+        with self._lock:
+            self.steps.append({"step": step, "duration_ms": duration_ms, "error": error, "skipped": skipped})
+
+    def mark_ready(self):
+        self.ready = True
+
+    def to_dict(self) -> Dict[str, Any]:
+        with self._lock:
+            return {"ready": self.ready, "warmup": list(self.steps)}
+
+def _synthetic_llm_request(client) -> Optional[str]:
+    if client is None:
+        raise RuntimeError("LLM client not configured")
+    from llm.replay import RecordingClient, ReplayClient
+    if isinstance(client, (RecordingClient, ReplayClient)):
+        # A synthetic exchange would be written into the recording, or always miss it
+        return "record/replay backend"
+    from agents.rewriter_agent import RewriterAgent
+    client.chat.completions.create(
+        model=RewriterAgent.model,
+        messages=[{"role": "user", "content": "Responde «ok»."}],
+        max_tokens=1,
+        temperature=0
+    )
+    return None
+
+def warm_up(state: Optional[ReadinessState] = None, coordinator=None) -> ReadinessState:
+    """Preload everything the first request would otherwise pay for, then mark ready"""
+    state = state or ReadinessState()
+    # Without a coordinator, warm the shared one that app.py serves requests with
+    built = {"coordinator": coordinator}
+
+    def build_coordinator():
+        if built["coordinator"] is None:
+            built["coordinator"] = shared_coordinator()
+
+    def lexicon():
+        from agents.lexicon import get_lexicon
+        get_lexicon()
+
+    def prompts():
+        from llm.prompts import load_short_system_prompt, load_system_prompt, select_system_prompt
+        load_system_prompt()
+        load_short_system_prompt()
+        select_system_prompt(SYNTHETIC_TEXT)
+        select_system_prompt(SYNTHETIC_TEXT * 10)
+
+    def heuristic_agents():
+        coordinator = built["coordinator"]
+        # Heuristic agents only: the LLM is warmed separately without a full rewrite
+        context = coordinator._agent_context(coordinator.analyzer.analyze(SYNTHETIC_TEXT))
+        for key in coordinator.registry.keys():
+            agent = coordinator.registry.get(key)
+            if not agent.uses_llm:
+                agent.analyze(SYNTHETIC_TEXT, context=context)
+
+    def llm_connection():
+        rewriter = built["coordinator"].rewriter
+        return _synthetic_llm_request(rewriter.client if rewriter is not None else shared_client())
+
+    steps = [
+        ("lexicon", lexicon),
+        ("prompts", prompts),
+        ("coordinator", build_coordinator),
+        ("heuristic_agents", heuristic_agents),
+        ("llm_connection", llm_connection),
+    ]
+    for name, step in steps:
+        start = time.perf_counter()
+        error = skipped = None
+        try:
+            skipped = step()
+        except Exception as e:
+            # A failed step leaves that resource cold but must not keep the instance out of rotation
+            error = f"{type(e).__name__}: {e}"
+            print(f"Warm-up step {name} failed: {error}")
+        duration_ms = (time.perf_counter() - start) * 1000
+        metrics.observe(f"warmup_{name}_ms", duration_ms)
+        state.record(name, duration_ms, error, skipped)
+
+    state.mark_ready()
+    return state
+
+def _port_open(port: int, host: str = "127.0.0.1") -> bool:
+    try:
+        with socket.create_connection((host, port), timeout=0.5):
+            return True
+    except OSError:
+        return False
+
+class HealthServer(ThreadingHTTPServer):
+    """Liveness (/healthz), readiness (/readyz) and metrics (/metrics) endpoint"""
+
+    daemon_threads = True
+
+    def __init__(self, port: int, state: ReadinessState, app_port: Optional[int] = None):
+        super().__init__(("0.0.0.0", port), HealthHandler)
+        self.state = state
+        self.app_port = app_port
+
+    def is_ready(self) -> bool:
+        # Ready once warmed up and the app itself accepts connections
+        return self.state.ready and (self.app_port is None or _port_open(self.app_port))
+
+class HealthHandler(BaseHTTPRequestHandler):
+
+    def do_GET(self):
+        path = self.path.split("?", 1)[0].rstrip("/")
+        if path == "/healthz":
+            self._send_json(200, {"status": "alive"})
+        elif path == "/readyz":
+            ready = self.server.is_ready()
+            body = self.server.state.to_dict()
+            body["ready"] = ready
+            body["metrics"] = metrics.snapshot()
+            self._send_json(200 if ready else 503, body)
+        elif path == "/metrics":
+            self._send_json(200, metrics.snapshot())
+        else:
+            self._send_json(404, {"error": "not found"})
+
+    def _send_json(self, status: int, payload: Dict[str, Any]):
+        body = json.dumps(payload, ensure_ascii=False).encode("utf-8")
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, format, *args):
+        pass  # probes hit this every few seconds
+
+def start_health_server(state: ReadinessState, port: Optional[int] = None,
+                        app_port: Optional[int] = None) -> Optional[HealthServer]:
+    """Serve the health endpoints from a background thread, when a health port is configured"""
+    if port is None:
+        if not os.environ.get(HEALTH_PORT_ENV):
+            return None
+        port = int(os.environ[HEALTH_PORT_ENV])
+    server = HealthServer(port, state, app_port)
+    threading.Thread(target=server.serve_forever, name="health-server", daemon=True).start()
+    return server